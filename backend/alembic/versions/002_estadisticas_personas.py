@@ -0,0 +1,36 @@
+"""Tabla de estadísticas materializadas de personas
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Cantidad de personas por tipo de sangre y edad; las cargas la mantienen al día y
+    # `python -m app.commands.estadisticas reconstruir` la recalcula si se desfasa
+    op.create_table(
+        'estadisticas_personas',
+        sa.Column('tipo_sangre', sa.String(length=3), nullable=False),
+        sa.Column('edad', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('tipo_sangre', 'edad')
+    )
+    op.execute(
+        "INSERT INTO estadisticas_personas (tipo_sangre, edad, cantidad) "
+        "SELECT tipo_sangre, edad, COUNT(*) FROM personas GROUP BY tipo_sangre, edad"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('estadisticas_personas')
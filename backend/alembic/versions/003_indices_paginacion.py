@@ -0,0 +1,25 @@
+"""Índices compuestos para la paginación por cursor
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_personas_created_at_id', 'personas', ['created_at', 'id'], unique=False)
+    op.create_index('ix_historial_cargas_created_at_id', 'historial_cargas', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_historial_cargas_created_at_id', table_name='historial_cargas')
+    op.drop_index('ix_personas_created_at_id', table_name='personas')
@@ -0,0 +1,34 @@
+"""Índices de búsqueda de personas
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Dominio del correo para búsquedas por prefijo (lo completa la aplicación al insertar)
+    op.add_column('personas', sa.Column('correo_dominio', sa.String(length=255), nullable=True))
+    op.execute("UPDATE personas SET correo_dominio = SUBSTRING_INDEX(correo, '@', -1)")
+    op.alter_column('personas', 'correo_dominio', existing_type=sa.String(length=255), nullable=False)
+    op.create_index('ix_personas_correo_dominio', 'personas', ['correo_dominio'], unique=False)
+
+    op.create_index('ft_personas_nombre_apellido', 'personas', ['nombre', 'apellido'], unique=False, mysql_prefix='FULLTEXT')
+    op.create_index('ix_personas_tipo_sangre_edad', 'personas', ['tipo_sangre', 'edad'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_personas_tipo_sangre_edad', table_name='personas')
+    op.drop_index('ft_personas_nombre_apellido', table_name='personas')
+    op.drop_index('ix_personas_correo_dominio', table_name='personas')
+    op.drop_column('personas', 'correo_dominio')
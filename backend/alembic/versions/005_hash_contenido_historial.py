@@ -0,0 +1,26 @@
+"""Hash del contenido del archivo en historial_cargas
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('historial_cargas', sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_historial_cargas_hash_contenido'), 'historial_cargas', ['hash_contenido'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_historial_cargas_hash_contenido'), table_name='historial_cargas')
+    op.drop_column('historial_cargas', 'hash_contenido')
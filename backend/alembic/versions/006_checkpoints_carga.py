@@ -0,0 +1,28 @@
+"""Checkpoints para reanudar cargas asíncronas
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('historial_cargas', sa.Column('modo', sa.String(length=10), nullable=True))
+    op.add_column('historial_cargas', sa.Column('ruta_archivo', sa.String(length=512), nullable=True))
+    op.add_column('historial_cargas', sa.Column('checkpoints', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('historial_cargas', 'checkpoints')
+    op.drop_column('historial_cargas', 'ruta_archivo')
+    op.drop_column('historial_cargas', 'modo')
@@ -0,0 +1,87 @@
+"""Detalles de carga fuera de historial_cargas e índice por task_id
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+historial_cargas = sa.table(
+    'historial_cargas',
+    sa.column('id', sa.Integer),
+    sa.column('detalles_duplicados', sa.JSON),
+    sa.column('detalles_errores', sa.JSON),
+)
+historial_detalles = sa.table(
+    'historial_detalles',
+    sa.column('historial_id', sa.Integer),
+    sa.column('tipo', sa.String),
+    sa.column('datos', sa.JSON),
+)
+COLUMNAS = {'duplicados': 'detalles_duplicados', 'errores': 'detalles_errores'}
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_historial_cargas_task_id'), 'historial_cargas', ['task_id'], unique=False)
+    op.create_table(
+        'historial_detalles',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('historial_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('datos', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['historial_id'], ['historial_cargas.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_historial_detalles_historial_tipo_id', 'historial_detalles', ['historial_id', 'tipo', 'id'], unique=False
+    )
+
+    # Pasar las listas guardadas en la fila a una fila por detalle
+    conexion = op.get_bind()
+    cargas = conexion.execute(sa.select(
+        historial_cargas.c.id, historial_cargas.c.detalles_duplicados, historial_cargas.c.detalles_errores
+    ))
+    for id, duplicados, errores in cargas.all():
+        for tipo, valor in (('duplicados', duplicados), ('errores', errores)):
+            if not valor:
+                continue
+            detalles = valor if isinstance(valor, list) else [valor]
+            conexion.execute(
+                historial_detalles.insert(),
+                [{'historial_id': id, 'tipo': tipo, 'datos': datos} for datos in detalles]
+            )
+
+    op.drop_column('historial_cargas', 'detalles_errores')
+    op.drop_column('historial_cargas', 'detalles_duplicados')
+
+
+def downgrade() -> None:
+    op.add_column('historial_cargas', sa.Column('detalles_duplicados', sa.JSON(), nullable=True))
+    op.add_column('historial_cargas', sa.Column('detalles_errores', sa.JSON(), nullable=True))
+
+    conexion = op.get_bind()
+    agrupados = {}
+    detalles = conexion.execute(sa.select(
+        historial_detalles.c.historial_id, historial_detalles.c.tipo, historial_detalles.c.datos
+    ).order_by(sa.text('id')))
+    for historial_id, tipo, datos in detalles.all():
+        agrupados.setdefault((historial_id, tipo), []).append(datos)
+    for (historial_id, tipo), lista in agrupados.items():
+        conexion.execute(
+            historial_cargas.update()
+            .where(historial_cargas.c.id == historial_id)
+            .values({COLUMNAS[tipo]: lista})
+        )
+
+    op.drop_index('ix_historial_detalles_historial_tipo_id', table_name='historial_detalles')
+    op.drop_table('historial_detalles')
+    op.drop_index(op.f('ix_historial_cargas_task_id'), table_name='historial_cargas')
@@ -0,0 +1,50 @@
+"""
+Mantenimiento de la tabla estadisticas_personas.
+
+Uso (desde backend/):
+    python -m app.commands.estadisticas reconstruir   # recalcular desde personas
+    python -m app.commands.estadisticas verificar     # comparar con el agregado en vivo
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.database import create_task_sessionmaker
+from app.services.estadistica_service import EstadisticaService
+
+
+async def reconstruir() -> int:
+    engine, SessionLocal = create_task_sessionmaker()
+    try:
+        async with SessionLocal() as db:
+            filas = await EstadisticaService.reconstruir(db)
+    finally:
+        await engine.dispose()
+    print(f"✅ Estadísticas reconstruidas ({filas} combinaciones de tipo de sangre y edad)")
+    return 0
+
+
+async def verificar() -> int:
+    engine, SessionLocal = create_task_sessionmaker()
+    try:
+        async with SessionLocal() as db:
+            diferencias = await EstadisticaService.verificar(db)
+    finally:
+        await engine.dispose()
+
+    if not diferencias:
+        print("✅ Las estadísticas coinciden con la tabla personas")
+        return 0
+
+    print(f"❌ {len(diferencias)} diferencias encontradas:")
+    for d in diferencias:
+        print(f"  {d['tipo_sangre']:>3} edad {d['edad']:>3}: materializado={d['materializado']} en_vivo={d['en_vivo']}")
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=["reconstruir", "verificar"])
+    args = parser.parse_args()
+    comando = reconstruir if args.accion == "reconstruir" else verificar
+    sys.exit(asyncio.run(comando()))
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Caché clave/valor con TTL y un máximo de entradas (se descartan las menos usadas)"""
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryLRUCache(CacheBackend):
+    """LRU en memoria del proceso; respaldo cuando Redis no está disponible"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entrada = self._entradas.get(key)
+        if entrada is None:
+            return None
+        expira, value = entrada
+        if expira is not None and expira < time.monotonic():
+            del self._entradas[key]
+            return None
+        self._entradas.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        self._entradas[key] = (time.monotonic() + ttl if ttl else None, value)
+        self._entradas.move_to_end(key)
+        while len(self._entradas) > self.max_entries:
+            self._entradas.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entradas.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """
+    Caché en Redis compartida entre procesos. Además del TTL de cada clave, un sorted set
+    guarda el último acceso y limita la cantidad de entradas descartando las más antiguas.
+    """
+
+    def __init__(self, url: str, prefix: str, max_entries: int):
+        self.url = url
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.Redis.from_url(self.url, socket_connect_timeout=1, socket_timeout=1)
+        return self._client
+
+    @property
+    def _indice(self) -> str:
+        return f"{self.prefix}:indice"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        valor = await self.client.get(f"{self.prefix}:{key}")
+        if valor is None:
+            return None
+        await self.client.zadd(self._indice, {key: time.time()})
+        return json.loads(valor)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.prefix}:{key}", json.dumps(value, default=str), ex=ttl)
+            pipe.zadd(self._indice, {key: time.time()})
+            pipe.zcard(self._indice)
+            *_, total = await pipe.execute()
+
+        if total > self.max_entries:
+            descartadas = await self.client.zpopmin(self._indice, total - self.max_entries)
+            if descartadas:
+                await self.client.delete(*(f"{self.prefix}:{clave.decode()}" for clave, _ in descartadas))
+
+    async def delete(self, key: str):
+        await self.client.delete(f"{self.prefix}:{key}")
+        await self.client.zrem(self._indice, key)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FallbackCache(CacheBackend):
+    """
+    Usa `primario` y, si falla, `respaldo` durante `espera` segundos antes de volver a
+    intentarlo, para no pagar el timeout de conexión en cada petición.
+    """
+
+    def __init__(self, primario: CacheBackend, respaldo: CacheBackend, espera: float = 30):
+        self.primario = primario
+        self.respaldo = respaldo
+        self.espera = espera
+        self._reintentar_en = 0.0
+
+    async def _ejecutar(self, operacion: str, *args):
+        if time.monotonic() >= self._reintentar_en:
+            try:
+                return await getattr(self.primario, operacion)(*args)
+            except Exception:
+                logger.warning("Caché principal no disponible, usando la caché local", exc_info=True)
+                self._reintentar_en = time.monotonic() + self.espera
+        return await getattr(self.respaldo, operacion)(*args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self._ejecutar("get", key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        await self._ejecutar("set", key, value, ttl)
+
+    async def delete(self, key: str):
+        await self._ejecutar("delete", key)
+
+    async def close(self):
+        await self.primario.close()
+        await self.respaldo.close()
+
+
+def create_cache_backend(prefix: str) -> CacheBackend:
+    local = MemoryLRUCache(settings.UPLOAD_CACHE_MAX_ENTRIES)
+    if settings.UPLOAD_CACHE_BACKEND == "memory":
+        return local
+    return FallbackCache(RedisCache(settings.REDIS_URL, prefix, settings.UPLOAD_CACHE_MAX_ENTRIES), local)
@@ -4,7 +4,8 @@ from app.core.config import settings
 celery_app = Celery(
     "xlsx_loader",
     broker=settings.CELERY_BROKER_URL,
-    backend=settings.CELERY_RESULT_BACKEND
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.carga_tasks"]
 )
 
 celery_app.conf.update(
@@ -13,4 +14,15 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    task_track_started=True,
+    # Con acks_late, un worker solo reserva la tarea que ejecuta: si muere, el resto sigue en la cola
+    worker_prefetch_multiplier=1,
+    task_time_limit=settings.CELERY_TASK_TIME_LIMIT,
+    task_routes={"app.tasks.*": {"queue": "carga_queue"}},
+    beat_schedule={
+        "limpiar-uploads": {
+            "task": "app.tasks.carga_tasks.limpiar_uploads",
+            "schedule": settings.UPLOAD_TEMP_CLEANUP_INTERVAL,
+        },
+    },
 )
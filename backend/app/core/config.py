@@ -1,12 +1,21 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import json
 
+# Valores que toma el perfil de producción para las variables que no se indiquen
+PERFIL_PRODUCCION = {
+    "DEBUG": False,
+    "DB_ECHO": False,
+}
+
 
 class Settings(BaseSettings):
     APP_NAME: str = "XLSX Loader API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    # development | production
+    ENVIRONMENT: str = "development"
     
     DATABASE_URL: str
     DB_HOST: str = "mysql"
@@ -14,6 +23,12 @@ class Settings(BaseSettings):
     DB_USER: str = "user"
     DB_PASSWORD: str = "password"
     DB_NAME: str = "xlsx_db"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30
+    # Eco de cada sentencia SQL en el log; si no se indica, sigue a DEBUG
+    DB_ECHO: Optional[bool] = None
     
     REDIS_URL: str = "redis://redis:6379/0"
     REDIS_HOST: str = "redis"
@@ -30,7 +45,45 @@ class Settings(BaseSettings):
         return json.loads(self.CORS_ORIGINS)
     
     MAX_UPLOAD_SIZE: int = 10485760
+    UPLOAD_TEMP_DIR: str = "temp_uploads"
+    UPLOAD_TEMP_TTL: int = 86400
+    UPLOAD_TEMP_CLEANUP_INTERVAL: int = 3600
+    UPLOAD_SPOOL_CHUNK_SIZE: int = 1048576
+    EXPORT_BATCH_SIZE: int = 1000
+    UPLOAD_CACHE_BACKEND: str = "redis"
+    UPLOAD_CACHE_TTL: int = 600
+    UPLOAD_CACHE_MAX_ENTRIES: int = 1000
+    UPLOAD_CACHE_MAX_ENTRY_BYTES: int = 1048576
+    UPLOAD_REPORT_SAMPLES: int = 20
     ASYNC_THRESHOLD: int = 200
+    PARSE_POOL_WORKERS: int = 2
+    PARSE_POOL_MAX_QUEUE: int = 8
+    DUPLICATE_CHECK_CHUNK_SIZE: int = 1000
+    BULK_INSERT_CHUNK_SIZE: int = 1000
+    BULK_INSERT_MAX_RETRIES: int = 3
+    PARALLEL_THRESHOLD: int = 50000
+    PARALLEL_CHUNK_ROWS: int = 25000
+    WS_PROGRESS_INTERVAL: float = 0.5
+    WS_PUBSUB_BACKEND: str = "redis"
+    WS_PUBSUB_CHANNEL: str = "xlsx_loader:ws"
+    WS_SEND_TIMEOUT: float = 5.0
+    
+    # Límite superior (inclusive) de cada rango de edad en las estadísticas; el último rango queda abierto
+    EDAD_RANGOS: str = '[18, 30, 45, 60]'
+    
+    @property
+    def edad_rangos_list(self) -> List[int]:
+        return sorted(json.loads(self.EDAD_RANGOS))
+    
+    @model_validator(mode="after")
+    def aplicar_perfil(self) -> "Settings":
+        if self.ENVIRONMENT == "production":
+            for campo, valor in PERFIL_PRODUCCION.items():
+                if campo not in self.model_fields_set:
+                    setattr(self, campo, valor)
+        if self.DB_ECHO is None:
+            self.DB_ECHO = self.DEBUG
+        return self
     
     class Config:
         env_file = ".env"
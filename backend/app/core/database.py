@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.pool_metrics import PoolInstrumentado
 
 ASYNC_DATABASE_URL = settings.DATABASE_URL.replace(
     "mysql+pymysql://", "mysql+aiomysql://"
@@ -8,10 +10,13 @@ ASYNC_DATABASE_URL = settings.DATABASE_URL.replace(
 
 engine = create_async_engine(
     ASYNC_DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=settings.DB_ECHO,
+    poolclass=PoolInstrumentado,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_timeout=settings.DB_POOL_TIMEOUT
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -35,6 +40,18 @@ async def get_db():
             await session.close()
 
 
+def create_task_sessionmaker():
+    """Engine y sesiones sin pool para tareas Celery (cada tarea usa su propio event loop)"""
+    task_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    return task_engine, async_sessionmaker(
+        task_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False
+    )
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,124 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from prometheus_client import (
+    CollectorRegistry, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+CONTENT_TYPE_METRICAS = CONTENT_TYPE_LATEST
+
+# Con PROMETHEUS_MULTIPROC_DIR definida antes de arrancar, prometheus_client guarda los
+# valores en archivos mmap de ese directorio y /metrics agrega los de todos los workers.
+# El directorio debe vaciarse en cada despliegue.
+MULTIPROCESO = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+ETAPA_DURACION = Histogram(
+    "xlsx_etapa_duracion_segundos",
+    "Duración de cada etapa de la carga de archivos",
+    ["etapa"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+ETAPA_FILAS = Histogram(
+    "xlsx_etapa_filas",
+    "Filas procesadas en cada ejecución de una etapa",
+    ["etapa"],
+    buckets=(1, 10, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+)
+HTTP_DURACION = Histogram(
+    "http_request_duracion_segundos",
+    "Latencia de las peticiones HTTP por ruta",
+    ["metodo", "ruta", "estado"]
+)
+HTTP_CONSULTAS_DB = Histogram(
+    "http_request_consultas_db",
+    "Sentencias SQL ejecutadas por petición HTTP",
+    ["metodo", "ruta"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+)
+
+# Contador de consultas de la petición en curso; una lista para que los listeners de
+# SQLAlchemy modifiquen el mismo objeto que creó el middleware
+_consultas: ContextVar[Optional[List[int]]] = ContextVar("consultas_db", default=None)
+
+# En los procesos del pool de parseo las etapas se acumulan aquí y el proceso de la API
+# las registra al recibir el resultado (ver app.core.procesos)
+_etapas_diferidas: Optional[List[Tuple[str, float, Optional[int]]]] = None
+
+
+def diferir_etapas() -> List[Tuple[str, float, Optional[int]]]:
+    """Desde ahora las etapas de este proceso se guardan en la lista devuelta en lugar de observarse"""
+    global _etapas_diferidas
+    _etapas_diferidas = []
+    return _etapas_diferidas
+
+
+def observar_etapa(etapa: str, segundos: float, filas: Optional[int] = None):
+    if _etapas_diferidas is not None:
+        _etapas_diferidas.append((etapa, segundos, filas))
+        return
+    ETAPA_DURACION.labels(etapa).observe(segundos)
+    if filas is not None:
+        ETAPA_FILAS.labels(etapa).observe(filas)
+
+
+@contextmanager
+def medir_etapa(etapa: str, filas: Optional[int] = None):
+    """Mide el bloque como una ejecución de `etapa`; solo se registra si termina sin error"""
+    inicio = time.perf_counter()
+    yield
+    observar_etapa(etapa, time.perf_counter() - inicio, filas)
+
+
+def contar_consultas(engine):
+    """Suma cada sentencia ejecutada por `engine` a la petición HTTP en curso"""
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        contador = _consultas.get()
+        if contador is not None:
+            contador[0] += 1
+
+
+def generar_metricas() -> bytes:
+    if MULTIPROCESO:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que registra latencia y consultas SQL por petición. La ruta se etiqueta
+    con la plantilla (/api/personas/{persona_id}), no con la URL, para acotar las series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = 500
+        contador = [0]
+        token = _consultas.set(contador)
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _consultas.reset(token)
+            # FastAPI deja la ruta resuelta en el scope
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            HTTP_DURACION.labels(scope["method"], ruta, str(estado)).observe(time.perf_counter() - inicio)
+            HTTP_CONSULTAS_DB.labels(scope["method"], ruta).observe(contador[0])
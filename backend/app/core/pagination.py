@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional, Tuple
+
+
+class CursorInvalidoError(ValueError):
+    """El cursor recibido no fue generado por encode_cursor"""
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Cursor opaco con la posición (created_at, id) del último elemento de la página"""
+    contenido = json.dumps([created_at.isoformat(), id])
+    return base64.urlsafe_b64encode(contenido.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(created_at), int(id)
+    except Exception:
+        raise CursorInvalidoError("Cursor de paginación inválido")
+
+
+async def paginar_keyset(
+    db: AsyncSession,
+    query: Select,
+    modelo: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Paginar por (created_at, id) descendente usando el índice compuesto de la tabla.
+    Cada página es un rango sobre el índice, sin OFFSET, así el costo no crece con la
+    profundidad. Devuelve los elementos y el cursor de la página siguiente (None al final).
+    
+    `query` puede seleccionar la entidad o solo columnas (que deben incluir created_at e id).
+    `skip` se mantiene por compatibilidad y solo se usa si no hay cursor.
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.where(or_(
+            modelo.created_at < created_at,
+            and_(modelo.created_at == created_at, modelo.id < id)
+        ))
+    elif skip:
+        query = query.offset(skip)
+    
+    # Se pide un elemento extra solo para saber si hay otra página
+    query = query.order_by(modelo.created_at.desc(), modelo.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    elementos = result.scalars().all() if len(query.selected_columns) == 1 else result.all()
+    
+    if len(elementos) <= limit:
+        return elementos, None
+    ultimo = elementos[limit - 1]
+    return elementos[:limit], encode_cursor(ultimo.created_at, ultimo.id)
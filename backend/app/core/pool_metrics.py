@@ -0,0 +1,55 @@
+import time
+from typing import Dict
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class MetricasPool:
+    """Contadores acumulados de las conexiones pedidas al pool desde que arrancó el proceso"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float):
+        self.checkouts += 1
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+
+
+metricas_pool = MetricasPool()
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool que mide cuánto tarda cada checkout (incluida la espera por una
+    conexión libre y el pre-ping) y cuenta los que agotan DB_POOL_TIMEOUT.
+    """
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super().connect()
+        except exc.TimeoutError:
+            metricas_pool.timeouts += 1
+            raise
+        metricas_pool.registrar(time.perf_counter() - inicio)
+        return conexion
+
+
+def estado_pool(pool) -> Dict:
+    """Estado actual del pool y métricas acumuladas de los checkouts"""
+    return {
+        "tamano": pool.size(),
+        "conexiones_en_uso": pool.checkedout(),
+        "conexiones_libres": pool.checkedin(),
+        # Negativo mientras el pool todavía no abrió todas sus conexiones base
+        "overflow": pool.overflow(),
+        "checkouts": metricas_pool.checkouts,
+        "timeouts": metricas_pool.timeouts,
+        "espera_promedio_ms": round(metricas_pool.espera_total * 1000 / metricas_pool.checkouts, 3)
+        if metricas_pool.checkouts else 0.0,
+        "espera_maxima_ms": round(metricas_pool.espera_maxima * 1000, 3),
+    }
@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core import metrics
+from app.core.config import settings
+from typing import Any, Callable, Optional
+
+
+class PoolSaturadoError(Exception):
+    """Hay PARSE_POOL_MAX_QUEUE trabajos en curso; la petición debe reintentarse más tarde"""
+
+
+def _ejecutar(funcion: Callable, args: tuple):
+    """Corre en el proceso hijo: devuelve el resultado y las etapas medidas durante la llamada"""
+    etapas = metrics.diferir_etapas()
+    return funcion(*args), etapas
+
+
+class PoolProcesos:
+    """
+    Pool de procesos para el trabajo de CPU de las peticiones (leer y validar XLSX), así
+    openpyxl no bloquea el event loop y el resto de las rutas siguen respondiendo.
+
+    Los procesos se crean con spawn y recién en el primer uso: un fork heredaría el event
+    loop, las conexiones a la base y los hilos del proceso de la API.
+
+    Como mucho se admiten PARSE_POOL_MAX_QUEUE trabajos a la vez (en ejecución o esperando
+    un proceso libre); por encima de eso `ejecutar` lanza PoolSaturadoError en lugar de
+    acumular archivos en memoria y en disco.
+    """
+
+    def __init__(self, procesos: int, max_cola: int):
+        self.procesos = procesos
+        self.max_cola = max_cola
+        self.en_curso = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def ejecutar(self, funcion: Callable, *args) -> Any:
+        """Ejecutar `funcion(*args)` en el pool; la función y sus argumentos deben poder serializarse"""
+        if self.en_curso >= self.max_cola:
+            raise PoolSaturadoError(f"Hay {self.en_curso} archivos en proceso, intente nuevamente en unos segundos")
+
+        self.en_curso += 1
+        try:
+            executor = self._obtener_executor()
+            loop = asyncio.get_running_loop()
+            resultado, etapas = await loop.run_in_executor(executor, _ejecutar, funcion, args)
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. sin memoria): el pool queda inutilizable y se recrea
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False)
+            raise
+        finally:
+            self.en_curso -= 1
+
+        for etapa in etapas:
+            metrics.observar_etapa(*etapa)
+        return resultado
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pool_procesos = PoolProcesos(settings.PARSE_POOL_WORKERS, settings.PARSE_POOL_MAX_QUEUE)
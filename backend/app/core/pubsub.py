@@ -0,0 +1,76 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List
+from app.core.config import settings
+
+
+class PubSubBackend:
+    """Transporte de mensajes entre procesos para las notificaciones WebSocket"""
+
+    async def publish(self, channel: str, message: Dict):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncIterator[Dict]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryPubSub(PubSubBackend):
+    """Implementación en memoria (un solo proceso), pensada para pruebas y desarrollo"""
+
+    def __init__(self):
+        self._queues: Dict[str, List[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: Dict):
+        for queue in self._queues.get(channel, []):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict]:
+        queue = asyncio.Queue()
+        self._queues.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues[channel].remove(queue)
+
+
+class RedisPubSub(PubSubBackend):
+    """Implementación sobre Redis pub/sub; el cliente se crea en el event loop que lo usa"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    async def publish(self, channel: str, message: Dict):
+        await self.client.publish(channel, json.dumps(message, default=str))
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Dict]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for mensaje in pubsub.listen():
+                yield json.loads(mensaje["data"])
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_pubsub_backend() -> PubSubBackend:
+    if settings.WS_PUBSUB_BACKEND == "memory":
+        return MemoryPubSub()
+    return RedisPubSub(settings.REDIS_URL)
@@ -1,11 +1,29 @@
 from fastapi import WebSocket
-from typing import List, Dict
+from app.core.config import settings
+from app.core.pubsub import PubSubBackend, create_pubsub_backend
+from typing import List, Dict, Set, Iterable, Optional
+from datetime import datetime
+import asyncio
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
-    def __init__(self):
+    """
+    Los eventos se publican en el backend pub/sub y cada proceso de la API los reenvía a
+    sus sockets locales (relay), así llegan a todos los workers de uvicorn y también los
+    generados por Celery. Sin backend, los eventos se entregan directamente en el proceso.
+    """
+    
+    def __init__(self, backend: Optional[PubSubBackend] = None):
         self.active_connections: List[WebSocket] = []
+        self.subscriptions: Dict[str, Set[WebSocket]] = {}
+        self.backend = backend
+        self._ultimo_progreso: Dict[str, float] = {}
+        self._relay_task: Optional[asyncio.Task] = None
     
     async def connect(self, websocket: WebSocket):
         """Aceptar nueva conexión WebSocket"""
@@ -13,41 +31,121 @@ class ConnectionManager:
         self.active_connections.append(websocket)
     
     def disconnect(self, websocket: WebSocket):
-        """Remover conexión WebSocket"""
+        """Remover conexión WebSocket y sus suscripciones"""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        for task_id in list(self.subscriptions):
+            self.unsubscribe(websocket, task_id)
+    
+    def subscribe(self, websocket: WebSocket, task_id: str):
+        """Suscribir un cliente a los eventos de una tarea"""
+        self.subscriptions.setdefault(task_id, set()).add(websocket)
+    
+    def unsubscribe(self, websocket: WebSocket, task_id: str):
+        """Cancelar la suscripción de un cliente a una tarea"""
+        suscriptores = self.subscriptions.get(task_id)
+        if suscriptores is not None:
+            suscriptores.discard(websocket)
+            if not suscriptores:
+                del self.subscriptions[task_id]
     
     async def send_personal_message(self, message: Dict, websocket: WebSocket):
         """Enviar mensaje a un cliente específico"""
         await websocket.send_json(message)
     
+    async def _send_with_timeout(self, connection: WebSocket, message: Dict) -> bool:
+        try:
+            await asyncio.wait_for(connection.send_json(message), timeout=settings.WS_SEND_TIMEOUT)
+            return True
+        except Exception:
+            return False
+    
+    async def _send_many(self, connections: Iterable[WebSocket], message: Dict):
+        """Enviar en paralelo; un cliente lento o caído no retrasa a los demás"""
+        connections = list(connections)
+        enviados = await asyncio.gather(
+            *(self._send_with_timeout(connection, message) for connection in connections)
+        )
+        
+        # Limpiar conexiones fallidas
+        for conn, enviado in zip(connections, enviados):
+            if not enviado:
+                self.disconnect(conn)
+    
     async def broadcast(self, message: Dict):
-        """Enviar mensaje a todos los clientes conectados"""
-        disconnected = []
-        for connection in self.active_connections:
+        """Enviar mensaje a todos los clientes conectados a este proceso"""
+        await self._send_many(self.active_connections, message)
+    
+    async def send_to_task(self, task_id: str, message: Dict):
+        """Enviar mensaje solo a los clientes de este proceso suscritos a la tarea"""
+        await self._send_many(self.subscriptions.get(task_id, ()), message)
+    
+    async def deliver(self, message: Dict, task_id: Optional[str] = None):
+        """Entregar un evento a los sockets locales"""
+        if task_id:
+            await self.send_to_task(task_id, message)
+        else:
+            await self.broadcast(message)
+    
+    async def _notify(self, message: Dict, task_id: Optional[str] = None):
+        if self.backend is None:
+            await self.deliver(message, task_id)
+            return
+        
+        try:
+            await self.backend.publish(settings.WS_PUBSUB_CHANNEL, {"task_id": task_id, "message": message})
+        except Exception:
+            # Las notificaciones no deben interrumpir la carga
+            logger.warning("No se pudo publicar la notificación %s", message.get("type"), exc_info=True)
+    
+    async def _relay(self):
+        while True:
             try:
-                await connection.send_json(message)
+                async for evento in self.backend.subscribe(settings.WS_PUBSUB_CHANNEL):
+                    await self.deliver(evento["message"], evento.get("task_id"))
+            except asyncio.CancelledError:
+                raise
             except Exception:
-                disconnected.append(connection)
-        
-        # Limpiar conexiones fallidas
-        for conn in disconnected:
-            self.disconnect(conn)
+                logger.warning("Relay de notificaciones interrumpido, reintentando", exc_info=True)
+                await asyncio.sleep(1)
+    
+    async def start_relay(self):
+        """Comenzar a reenviar los eventos del backend pub/sub a los sockets locales"""
+        if self.backend is not None and self._relay_task is None:
+            self._relay_task = asyncio.create_task(self._relay())
     
-    async def notify_upload_start(self, filename: str, total_records: int):
+    async def stop_relay(self):
+        if self._relay_task is not None:
+            self._relay_task.cancel()
+            try:
+                await self._relay_task
+            except asyncio.CancelledError:
+                pass
+            self._relay_task = None
+        if self.backend is not None:
+            await self.backend.close()
+    
+    async def notify_upload_start(self, filename: str, total_records: int, task_id: Optional[str] = None):
         """Notificar inicio de carga"""
-        await self.broadcast({
+        await self._notify({
             "type": "upload_start",
             "data": {
+                "task_id": task_id,
                 "filename": filename,
                 "total_records": total_records,
                 "timestamp": str(datetime.utcnow())
             }
-        })
+        }, task_id)
     
     async def notify_upload_progress(self, task_id: str, progress: int, processed: int, total: int):
-        """Notificar progreso de carga"""
-        await self.broadcast({
+        """Notificar progreso de carga, como máximo una vez cada WS_PROGRESS_INTERVAL segundos"""
+        ahora = time.monotonic()
+        ultimo = self._ultimo_progreso.get(task_id)
+        if processed < total and ultimo is not None and ahora - ultimo < settings.WS_PROGRESS_INTERVAL:
+            return
+        self._ultimo_progreso[task_id] = ahora
+        
+        await self._notify({
             "type": "upload_progress",
             "data": {
                 "task_id": task_id,
@@ -56,7 +154,7 @@ class ConnectionManager:
                 "total": total,
                 "timestamp": str(datetime.utcnow())
             }
-        })
+        }, task_id)
     
     async def notify_upload_complete(
         self, 
@@ -64,31 +162,37 @@ class ConnectionManager:
         exitosos: int, 
         duplicados: int, 
         errores: int,
-        detalles_duplicados: List[Dict] = None
+        detalles_duplicados: List[Dict] = None,
+        task_id: Optional[str] = None
     ):
         """Notificar finalización de carga"""
-        await self.broadcast({
+        self._ultimo_progreso.pop(task_id, None)
+        await self._notify({
             "type": "upload_complete",
             "data": {
+                "task_id": task_id,
                 "filename": filename,
                 "exitosos": exitosos,
                 "duplicados": duplicados,
                 "errores": errores,
-                "detalles_duplicados": detalles_duplicados or [],
+                # Solo una muestra: el reporte completo se consulta en el historial
+                "detalles_duplicados": (detalles_duplicados or [])[:settings.UPLOAD_REPORT_SAMPLES],
                 "timestamp": str(datetime.utcnow())
             }
-        })
+        }, task_id)
     
-    async def notify_upload_error(self, filename: str, error: str):
+    async def notify_upload_error(self, filename: str, error: str, task_id: Optional[str] = None):
         """Notificar error en carga"""
-        await self.broadcast({
+        self._ultimo_progreso.pop(task_id, None)
+        await self._notify({
             "type": "upload_error",
             "data": {
+                "task_id": task_id,
                 "filename": filename,
                 "error": error,
                 "timestamp": str(datetime.utcnow())
             }
-        })
+        }, task_id)
     
     async def notify_duplicates_detected(self, duplicados: List[Dict]):
         """Notificar duplicados detectados"""
@@ -102,7 +206,5 @@ class ConnectionManager:
         })
 
 
-from datetime import datetime
-
 # Instancia global del manager
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(backend=create_pubsub_backend())
\ No newline at end of file
@@ -1,7 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import init_db, engine
+from app.core.pool_metrics import estado_pool
+from app.core.procesos import pool_procesos
+from app.core.metrics import MetricasMiddleware, contar_consultas, generar_metricas, CONTENT_TYPE_METRICAS
+from app.core.websocket_manager import manager
+from app.services.upload_cache import cache
 from app.routers import upload, personas, historial, tasks, websocket
 from contextlib import asynccontextmanager
 
@@ -11,8 +16,12 @@ async def lifespan(app: FastAPI):
     print("🚀 Iniciando aplicación...")
     await init_db()
     print("✅ Base de datos inicializada")
+    await manager.start_relay()
     yield
     print("🛑 Cerrando aplicación...")
+    await manager.stop_relay()
+    await cache.close()
+    pool_procesos.cerrar()
 
 
 app = FastAPI(
@@ -21,6 +30,8 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+contar_consultas(engine)
+app.add_middleware(MetricasMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -51,3 +62,18 @@ async def health_check():
         "estado": "healthy",
         "servicio": settings.APP_NAME
     }
+
+
+@app.get("/health/db")
+async def health_db():
+    """Estado del pool de conexiones, para dimensionar DB_POOL_SIZE y DB_MAX_OVERFLOW"""
+    return {
+        "estado": "healthy",
+        "pool": estado_pool(engine.pool)
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=generar_metricas(), media_type=CONTENT_TYPE_METRICAS)
@@ -1,4 +1,5 @@
 from app.models.persona import Persona, TipoSangre
-from app.models.historial import HistorialCarga
+from app.models.historial import HistorialCarga, HistorialDetalle
+from app.models.estadistica import EstadisticaPersona
 
-__all__ = ["Persona", "TipoSangre", "HistorialCarga"]
\ No newline at end of file
+__all__ = ["Persona", "TipoSangre", "HistorialCarga", "HistorialDetalle", "EstadisticaPersona"]
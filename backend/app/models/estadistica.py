@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+
+
+class EstadisticaPersona(Base):
+    """
+    Resumen materializado de personas: cantidad por tipo de sangre y edad exacta.
+    Se actualiza en la misma transacción que cada inserción, actualización o borrado.
+    """
+    __tablename__ = "estadisticas_personas"
+    
+    tipo_sangre = Column(String(3), primary_key=True)
+    edad = Column(Integer, primary_key=True, autoincrement=False)
+    cantidad = Column(Integer, nullable=False, default=0)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Index, ForeignKey
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class HistorialCarga(Base):
     __tablename__ = "historial_cargas"
+    __table_args__ = (
+        # Paginación por cursor (created_at, id)
+        Index("ix_historial_cargas_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre_archivo = Column(String(255), nullable=False)
@@ -13,9 +17,32 @@ class HistorialCarga(Base):
     registros_duplicados = Column(Integer, nullable=False, default=0)
     registros_error = Column(Integer, nullable=False, default=0)
     fue_asincrono = Column(Boolean, default=False)
-    task_id = Column(String(255), nullable=True)
+    task_id = Column(String(255), nullable=True, index=True)
+    # SHA-256 del archivo subido
+    hash_contenido = Column(String(64), nullable=True, index=True)
+    # Datos para reanudar una carga asíncrona interrumpida
+    modo = Column(String(10), nullable=True)
+    ruta_archivo = Column(String(512), nullable=True)
+    # Filas de datos ya confirmadas por origen: {"archivo": n} o {"parte0": n, "parte1": m, ...}
+    checkpoints = Column(JSON, nullable=True)
     estado = Column(String(50), nullable=False)
-    detalles_duplicados = Column(JSON, nullable=True)
-    detalles_errores = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class HistorialDetalle(Base):
+    """
+    Un duplicado o error de una carga. Se guardan fuera de historial_cargas para que
+    actualizar el progreso no reescriba listas que pueden tener miles de elementos.
+    """
+    __tablename__ = "historial_detalles"
+    __table_args__ = (
+        # Páginas de un tipo de detalle en orden de inserción
+        Index("ix_historial_detalles_historial_tipo_id", "historial_id", "tipo", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    historial_id = Column(Integer, ForeignKey("historial_cargas.id", ondelete="CASCADE"), nullable=False)
+    # duplicados | errores
+    tipo = Column(String(20), nullable=False)
+    datos = Column(JSON, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -15,14 +15,27 @@ class TipoSangre(str, enum.Enum):
     O_NEGATIVO = "O-"
 
 
+def _dominio_correo(context) -> str:
+    return context.get_current_parameters()["correo"].rsplit("@", 1)[-1]
+
+
 class Persona(Base):
     __tablename__ = "personas"
+    __table_args__ = (
+        # Paginación por cursor (created_at, id)
+        Index("ix_personas_created_at_id", "created_at", "id"),
+        # Búsqueda: texto completo en nombre/apellido y filtros por tipo de sangre y edad
+        Index("ft_personas_nombre_apellido", "nombre", "apellido", mysql_prefix="FULLTEXT"),
+        Index("ix_personas_tipo_sangre_edad", "tipo_sangre", "edad"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre = Column(String(100), nullable=False)
     apellido = Column(String(100), nullable=False)
     edad = Column(Integer, nullable=False)
     correo = Column(String(255), unique=True, nullable=False, index=True)
+    # Se completa al insertar, para buscar por dominio con un índice de prefijo
+    correo_dominio = Column(String(255), nullable=False, index=True, default=_dominio_correo)
     tipo_sangre = Column(SQLEnum(TipoSangre), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,8 +1,200 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.pagination import CursorInvalidoError
+from app.schemas.historial import HistorialCargaUpdate, HistorialCargaResponse, TipoDetalle
+from app.schemas.response import ApiResponse, error_response, success_response, fast_success_response
+from app.services.export_service import ExportService
+from app.services.historial_service import HistorialService, DETALLES_POR_PAGINA
+from app.tasks.carga_tasks import procesar_archivo, partes_pendientes
+from typing import Optional
+import os
 
 router = APIRouter(prefix="/historial", tags=["Historial"])
 
 
-@router.get("")
-async def get_historial():
-    return {"message": "Endpoint en desarrollo"}
+@router.get("", response_model=ApiResponse)
+async def get_historial(
+    skip: int = Query(0, ge=0, description="Obsoleto: usar cursor; OFFSET se vuelve lento en páginas profundas"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        historial, next_cursor = await HistorialService.get_page(db, limit=limit, cursor=cursor, skip=skip)
+        
+        return fast_success_response(
+            titulo="Historial Obtenido",
+            mensaje=f"Se encontraron {len(historial)} cargas",
+            datos={
+                "historial": historial,
+                "total": len(historial),
+                "next_cursor": next_cursor
+            }
+        )
+    except CursorInvalidoError as e:
+        return error_response(
+            titulo="Cursor Inválido",
+            mensaje="El cursor de paginación no es válido",
+            errores=[str(e)]
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al obtener el historial",
+            errores=[str(e)]
+        )
+
+
+@router.get("/{historial_id}", response_model=ApiResponse)
+async def get_carga(historial_id: int, db: AsyncSession = Depends(get_db)):
+    """Una carga con la primera página de sus duplicados y errores"""
+    try:
+        historial = await HistorialService.get_by_id(db, historial_id)
+        if not historial:
+            return error_response(
+                titulo="Carga No Encontrada",
+                mensaje=f"No existe la carga {historial_id}",
+                errores=["ID no encontrado"]
+            )
+        
+        datos = HistorialCargaResponse.model_validate(historial).model_dump()
+        totales = await HistorialService.contar_detalles(db, historial_id)
+        for tipo in TipoDetalle:
+            registros, next_cursor = await HistorialService.get_detalles(db, historial_id, tipo)
+            datos[f"detalles_{tipo.value}"] = {
+                "total": totales[tipo.value],
+                "registros": registros,
+                "next_cursor": next_cursor
+            }
+        
+        return success_response(
+            titulo="Carga Obtenida",
+            mensaje=f"Carga {historial.nombre_archivo}",
+            datos=datos
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al obtener la carga",
+            errores=[str(e)]
+        )
+
+
+@router.get("/{historial_id}/detalles", response_model=ApiResponse)
+async def get_detalles_carga(
+    historial_id: int,
+    tipo: TipoDetalle = Query(TipoDetalle.DUPLICADOS),
+    limit: int = Query(DETALLES_POR_PAGINA, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="next_cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Duplicados o errores de una carga, paginados en orden de detección"""
+    try:
+        registros, next_cursor = await HistorialService.get_detalles(
+            db, historial_id, tipo, limit=limit, cursor=cursor
+        )
+        
+        return fast_success_response(
+            titulo="Detalles Obtenidos",
+            mensaje=f"Se encontraron {len(registros)} {tipo.value}",
+            datos={
+                "registros": registros,
+                "total": len(registros),
+                "next_cursor": next_cursor
+            }
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al obtener los detalles de la carga",
+            errores=[str(e)]
+        )
+
+
+@router.get("/{historial_id}/rechazados")
+async def descargar_rechazados(historial_id: int):
+    """Descargar en XLSX las filas rechazadas de una carga con el motivo de cada una"""
+    async def contenido():
+        # Sesión propia: debe vivir mientras dure la respuesta, no solo el handler
+        async with AsyncSessionLocal() as db:
+            async for bloque in ExportService.rechazados(db, historial_id):
+                yield bloque
+    
+    return StreamingResponse(
+        contenido(),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="rechazados_{historial_id}.xlsx"'}
+    )
+
+
+@router.post("/{historial_id}/resume", response_model=ApiResponse)
+async def resume_carga(
+    historial_id: int,
+    forzar: bool = Query(False, description="Reanudar aunque la carga figure en curso (p. ej. tras reiniciar los workers)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Vuelve a encolar una carga asíncrona interrumpida. La tarea retoma cada archivo o
+    parte desde su último checkpoint, así las filas ya confirmadas no se procesan de nuevo.
+    """
+    try:
+        historial = await HistorialService.get_by_id(db, historial_id)
+        if not historial:
+            return error_response(
+                titulo="Carga No Encontrada",
+                mensaje=f"No existe la carga {historial_id}",
+                errores=["ID no encontrado"]
+            )
+        
+        if historial.estado == "completed":
+            return error_response(
+                titulo="Carga Completada",
+                mensaje="La carga ya terminó, no hay nada que reanudar",
+                errores=[f"Estado: {historial.estado}"]
+            )
+        
+        if not historial.fue_asincrono or not historial.ruta_archivo:
+            return error_response(
+                titulo="Carga No Reanudable",
+                mensaje="Solo se pueden reanudar cargas procesadas en segundo plano",
+                errores=["La carga no guardó su archivo"]
+            )
+        
+        if historial.estado in ("pending", "processing") and not forzar:
+            return error_response(
+                titulo="Carga En Curso",
+                mensaje="La carga sigue en proceso; use forzar=true si los workers se reiniciaron",
+                errores=[f"Estado: {historial.estado}"]
+            )
+        
+        ruta = historial.ruta_archivo
+        if not os.path.exists(ruta) and not partes_pendientes(ruta):
+            return error_response(
+                titulo="Archivo No Disponible",
+                mensaje="El archivo de la carga ya no existe en el servidor",
+                errores=[ruta]
+            )
+        
+        await HistorialService.update(db, historial_id, HistorialCargaUpdate(estado="pending"))
+        procesar_archivo.apply_async(
+            kwargs={"ruta": ruta, "historial_id": historial_id, "modo": historial.modo},
+            task_id=historial.task_id
+        )
+        
+        return success_response(
+            titulo="Carga Reanudada",
+            mensaje="La carga continuará desde el último bloque confirmado",
+            datos={
+                "task_id": historial.task_id,
+                "historial_id": historial_id,
+                "checkpoints": historial.checkpoints or {}
+            }
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al reanudar la carga",
+            errores=[str(e)]
+        )
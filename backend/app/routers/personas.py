@@ -1,32 +1,50 @@
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
-from app.schemas.response import ApiResponse, success_response, error_response
-from app.schemas.persona import PersonaResponse
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.pagination import CursorInvalidoError
+from app.schemas.response import ApiResponse, success_response, error_response, fast_success_response
+from app.schemas.persona import FormatoExportacion
+from app.models.persona import TipoSangre
 from app.services.persona_service import PersonaService
-from typing import List
+from app.services.export_service import ExportService
+from typing import Optional
 
 router = APIRouter(prefix="/personas", tags=["Personas"])
 
+TIPOS_EXPORTACION = {
+    FormatoExportacion.CSV: "text/csv",
+    FormatoExportacion.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    FormatoExportacion.NDJSON: "application/x-ndjson",
+}
+
 
 @router.get("", response_model=ApiResponse)
 async def get_personas(
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, description="Obsoleto: usar cursor; OFFSET se vuelve lento en páginas profundas"),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        personas = await PersonaService.get_all(db, skip=skip, limit=limit)
-        personas_response = [PersonaResponse.model_validate(p) for p in personas]
+        # Filas de columnas directo a JSON con orjson, sin pasar por PersonaResponse ni ApiResponse
+        personas, next_cursor = await PersonaService.get_page(db, limit=limit, cursor=cursor, skip=skip)
         
-        return success_response(
+        return fast_success_response(
             titulo="Personas Obtenidas",
-            mensaje=f"Se encontraron {len(personas_response)} personas",
+            mensaje=f"Se encontraron {len(personas)} personas",
             datos={
-                "personas": [p.model_dump() for p in personas_response],
-                "total": len(personas_response)
+                "personas": personas,
+                "total": len(personas),
+                "next_cursor": next_cursor
             }
         )
+    except CursorInvalidoError as e:
+        return error_response(
+            titulo="Cursor Inválido",
+            mensaje="El cursor de paginación no es válido",
+            errores=[str(e)]
+        )
     except Exception as e:
         return error_response(
             titulo="Error",
@@ -35,10 +53,70 @@ async def get_personas(
         )
 
 
+@router.get("/buscar", response_model=ApiResponse)
+async def search_personas(
+    q: Optional[str] = Query(None, max_length=200, description="Palabras o prefijos de nombre y apellido"),
+    correo: Optional[str] = Query(None, max_length=255, description="Prefijo del correo"),
+    dominio: Optional[str] = Query(None, max_length=255, description="Prefijo del dominio del correo"),
+    tipo_sangre: Optional[TipoSangre] = Query(None),
+    edad_min: Optional[int] = Query(None, ge=0, le=150),
+    edad_max: Optional[int] = Query(None, ge=0, le=150),
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db)
+):
+    if edad_min is not None and edad_max is not None and edad_min > edad_max:
+        return error_response(
+            titulo="Búsqueda Inválida",
+            mensaje="edad_min no puede ser mayor que edad_max"
+        )
+    
+    try:
+        personas, next_cursor = await PersonaService.search(
+            db,
+            q=q,
+            correo=correo,
+            dominio=dominio,
+            tipo_sangre=tipo_sangre,
+            edad_min=edad_min,
+            edad_max=edad_max,
+            limit=limit,
+            cursor=cursor
+        )
+        
+        return fast_success_response(
+            titulo="Búsqueda Completada",
+            mensaje=f"Se encontraron {len(personas)} personas",
+            datos={
+                "personas": personas,
+                "total": len(personas),
+                "next_cursor": next_cursor
+            }
+        )
+    except CursorInvalidoError as e:
+        return error_response(
+            titulo="Cursor Inválido",
+            mensaje="El cursor de paginación no es válido",
+            errores=[str(e)]
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al buscar personas",
+            errores=[str(e)]
+        )
+
+
 @router.get("/estadisticas/resumen", response_model=ApiResponse)
-async def get_statistics(db: AsyncSession = Depends(get_db)):
+async def get_statistics(
+    en_vivo: bool = Query(False, description="Calcular sobre la tabla personas en lugar del resumen materializado"),
+    db: AsyncSession = Depends(get_db)
+):
     try:
-        stats = await PersonaService.get_statistics(db)
+        if en_vivo:
+            stats = await PersonaService.get_live_statistics(db)
+        else:
+            stats = await PersonaService.get_statistics(db)
         return success_response(
             titulo="Estadísticas Obtenidas",
             mensaje="Estadísticas calculadas correctamente",
@@ -50,3 +128,21 @@ async def get_statistics(db: AsyncSession = Depends(get_db)):
             mensaje="Error al obtener estadísticas",
             errores=[str(e)]
         )
+
+
+@router.get("/export")
+async def export_personas(formato: FormatoExportacion = Query(FormatoExportacion.CSV, alias="format")):
+    """Descargar todas las personas en streaming, con memoria constante"""
+    generador = getattr(ExportService, formato.value)
+    
+    async def contenido():
+        # Sesión propia: debe vivir mientras dure la respuesta, no solo el handler
+        async with AsyncSessionLocal() as db:
+            async for bloque in generador(db):
+                yield bloque
+    
+    return StreamingResponse(
+        contenido(),
+        media_type=TIPOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f'attachment; filename="personas.{formato.value}"'}
+    )
@@ -1,8 +1,54 @@
 from fastapi import APIRouter
+from celery.result import AsyncResult
+from app.core.celery_app import celery_app
+from app.schemas.response import ApiResponse, success_response, error_response
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+ESTADOS_CELERY = {
+    "PENDING": "pending",
+    "RECEIVED": "pending",
+    "STARTED": "processing",
+    "PROGRESS": "processing",
+    "RETRY": "processing",
+    "SUCCESS": "completed",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
 
-@router.get("/{task_id}/status")
+
+@router.get("/{task_id}/status", response_model=ApiResponse)
 async def get_task_status(task_id: str):
-    return {"message": "Endpoint en desarrollo"}
+    try:
+        tarea = AsyncResult(task_id, app=celery_app)
+        estado = ESTADOS_CELERY.get(tarea.state, "processing")
+        status = {"task_id": task_id, "estado": estado}
+        
+        if tarea.state == "PROGRESS":
+            status.update(tarea.info or {})
+            status["mensaje"] = f"Procesados {status.get('procesados', 0)} de {status.get('total', 0)} registros"
+        elif estado == "completed":
+            resultado = tarea.result or {}
+            status.update(
+                progreso=100,
+                exitosos=resultado.get("registros_exitosos", 0),
+                duplicados=resultado.get("registros_duplicados", 0),
+                resultado=resultado,
+                mensaje=f"Se cargaron {resultado.get('registros_exitosos', 0)} registros correctamente"
+            )
+        elif estado == "failed":
+            status.update(mensaje="La carga falló", error=str(tarea.info))
+        else:
+            status.update(progreso=0, mensaje="La carga está en cola")
+        
+        return success_response(
+            titulo="Estado de Tarea",
+            mensaje=status["mensaje"],
+            datos=status
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al consultar el estado de la tarea",
+            errores=[str(e)]
+        )
@@ -1,22 +1,180 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.schemas.response import ApiResponse, success_response, error_response
-from app.schemas.persona import PersonaCreate
-from app.services.persona_service import PersonaService
-from typing import List
-import openpyxl
-from io import BytesIO
+from app.core.procesos import pool_procesos, PoolSaturadoError
+from app.schemas.response import ApiResponse, success_response, error_response, http_error_response
+from app.schemas.persona import PersonaCreate, ModoCarga
+from app.services.persona_service import PersonaService, DuplicadosError
+from app.services.historial_service import HistorialService
+from app.services.xlsx_stream import guardar_upload, texto_error, leer_personas_xlsx, LecturaXLSX, ArchivoDemasiadoGrandeError
+from app.services.xlsx_validator import validar_xlsx
+from app.services.validacion_rapida import FilaPersona
+from app.services.upload_cache import UploadCacheService
+from app.schemas.historial import HistorialCargaCreate
+from app.core.config import settings
+from app.core.websocket_manager import manager
+from app.tasks.carga_tasks import procesar_archivo
+from typing import List, Optional
+from uuid import uuid4
+import os
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 
+def duplicados_response(error: DuplicadosError, historial_id: Optional[int] = None) -> ApiResponse:
+    muestras = settings.UPLOAD_REPORT_SAMPLES
+    errores = [
+        f"Registro {d['indice']}: {d['correo']} - {d['mensaje']}"
+        for d in error.duplicados[:muestras]
+    ]
+    if len(error.duplicados) > muestras:
+        errores.append(f"... y {len(error.duplicados) - muestras} más" + (
+            f": ver /api/historial/{historial_id}/detalles" if historial_id is not None else ""
+        ))
+    return error_response(
+        titulo="Carga Cancelada",
+        mensaje=f"Se encontraron {len(error.duplicados)} duplicados. No se cargó ningún registro.",
+        errores=errores
+    )
+
+
+async def carga_previa_response(db: AsyncSession, hash_contenido: str, modo: ModoCarga) -> Optional[ApiResponse]:
+    """Respuesta para un archivo idéntico ya cargado (o en curso), o None si hay que procesarlo"""
+    entrada = await UploadCacheService.get_carga(hash_contenido, modo)
+    if entrada is None:
+        return None
+    
+    historial = await HistorialService.get_by_id(db, entrada["historial_id"])
+    if historial is None or historial.estado == "failed":
+        await UploadCacheService.invalidar_carga(hash_contenido, modo)
+        return None
+    
+    if historial.estado in ("pending", "processing"):
+        return success_response(
+            titulo="Carga en Proceso",
+            mensaje="Este archivo ya se está procesando; se retoma la carga existente",
+            datos={
+                "asincrono": historial.fue_asincrono,
+                "task_id": historial.task_id,
+                "historial_id": historial.id,
+                "total_registros": historial.total_registros,
+                "desde_cache": True
+            }
+        )
+    
+    if entrada["respuesta"] is not None:
+        respuesta = ApiResponse(**entrada["respuesta"])
+        if isinstance(respuesta.datos, dict):
+            respuesta.datos["desde_cache"] = True
+        return respuesta
+    
+    # Carga asíncrona terminada: el resultado está en el historial
+    return success_response(
+        titulo="Carga Previa",
+        mensaje=f"Este archivo ya se cargó. {historial.registros_exitosos} registros exitosos, "
+                f"{historial.registros_duplicados} duplicados, {historial.registros_error} errores.",
+        datos={
+            "task_id": historial.task_id,
+            "historial_id": historial.id,
+            "registros_exitosos": historial.registros_exitosos,
+            "registros_duplicados": historial.registros_duplicados,
+            "registros_error": historial.registros_error,
+            "desde_cache": True
+        }
+    )
+
+
+def saturado_response(error: PoolSaturadoError) -> ORJSONResponse:
+    return http_error_response(
+        429,
+        titulo="Servidor Ocupado",
+        mensaje="Hay demasiados archivos en proceso, intente nuevamente en unos segundos",
+        errores=[str(error)],
+        headers={"Retry-After": "5"}
+    )
+
+
+def resultado_response(carga, lector: LecturaXLSX, task_id: str, historial_id: int) -> ApiResponse:
+    """
+    Resumen de la carga: contadores, errores agrupados por tipo y las primeras
+    UPLOAD_REPORT_SAMPLES muestras. El reporte completo queda en el historial.
+    """
+    muestras = settings.UPLOAD_REPORT_SAMPLES
+    errores = lector.errores
+    if not lector.total_validos:
+        return error_response(
+            titulo="Sin Datos",
+            mensaje="No se encontraron datos válidos en el archivo",
+            errores=[texto_error(error) for error in errores[:muestras]]
+        )
+    
+    personas_creadas, duplicados = carga.ids_creados, carga.duplicados
+    
+    resultado = {
+        "task_id": task_id,
+        "historial_id": historial_id,
+        "total_procesados": lector.total_validos,
+        "registros_exitosos": len(personas_creadas),
+        "registros_actualizados": carga.actualizados,
+        "registros_sin_cambios": carga.sin_cambios,
+        "registros_duplicados": len(duplicados),
+        "registros_error": len(errores),
+        "errores_por_tipo": dict(lector.errores_por_tipo),
+        "errores": [texto_error(error) for error in errores[:muestras]],
+        "muestras_truncadas": len(errores) > muestras or len(duplicados) > muestras
+    }
+    
+    if duplicados:
+        resultado["detalles_duplicados"] = duplicados[:muestras]
+    
+    if errores:
+        return success_response(
+            titulo="Carga con Advertencias",
+            mensaje=f"Se cargaron {len(personas_creadas)} registros. {len(duplicados)} duplicados. {len(errores)} errores.",
+            datos=resultado
+        )
+    
+    if carga.actualizados or carga.sin_cambios:
+        return success_response(
+            titulo="Carga con Actualizaciones",
+            mensaje=f"Se cargaron {len(personas_creadas)} registros. {carga.actualizados} actualizados, {carga.sin_cambios} sin cambios.",
+            datos=resultado
+        )
+    
+    if duplicados:
+        return success_response(
+            titulo="Carga con Duplicados",
+            mensaje=f"Se cargaron {len(personas_creadas)} registros. {len(duplicados)} duplicados omitidos.",
+            datos=resultado
+        )
+    
+    return success_response(
+        titulo="Carga Exitosa",
+        mensaje=f"Se cargaron {len(personas_creadas)} registros correctamente",
+        datos=resultado
+    )
+
+
 @router.post("/validate-and-process")
 async def validate_and_process_file(
     file: UploadFile = File(...),
+    mode: ModoCarga = Query(ModoCarga.SKIP),
+    task_id: Optional[str] = Query(None, max_length=255),
+    forzar: bool = Query(False, description="Procesar aunque el mismo archivo ya se haya cargado"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Valida y procesa el archivo XLSX completo en el backend"""
+    """
+    Valida y procesa el archivo XLSX completo en el backend.
+    
+    `task_id` permite al cliente suscribirse por WebSocket al progreso antes de subir el archivo;
+    si no se indica, se genera uno y se devuelve en la respuesta. Un task_id que ya usa otra
+    carga se rechaza con 409.
+    
+    Si el mismo contenido (SHA-256) ya se cargó en el mismo modo dentro de UPLOAD_CACHE_TTL,
+    se devuelve el resultado anterior, o el task_id de la carga que sigue en curso.
+    """
+    task_id = task_id or str(uuid4())
     
     # Validar extensión
     if not file.filename.endswith(('.xlsx', '.xls')):
@@ -26,101 +184,163 @@ async def validate_and_process_file(
             errores=["Extensión no válida"]
         )
     
+    ruta = None
+    historial_id = None
     try:
-        # Leer el archivo
-        contents = await file.read()
-        workbook = openpyxl.load_workbook(BytesIO(contents))
-        sheet = workbook.active
+        # Copiar el archivo a disco por bloques
+        try:
+            ruta, hash_contenido = await guardar_upload(file)
+        except ArchivoDemasiadoGrandeError as e:
+            return error_response(
+                titulo="Archivo Demasiado Grande",
+                mensaje=str(e),
+                errores=["Tamaño de archivo no permitido"]
+            )
+        
+        if not forzar:
+            previa = await carga_previa_response(db, hash_contenido, mode)
+            if previa is not None:
+                return previa
         
-        # Leer datos
-        personas = []
-        errores = []
+        # El task_id identifica la carga en el historial, en Celery y en el WebSocket
+        if await HistorialService.get_by_task_id(db, task_id) is not None:
+            return http_error_response(
+                409,
+                titulo="Tarea Duplicada",
+                mensaje=f"Ya existe una carga con el task_id {task_id}",
+                errores=["Use otro task_id u omítalo para que se genere uno"]
+            )
         
-        # Obtener headers (primera fila)
-        headers = [cell.value for cell in sheet[1]]
+        # openpyxl es CPU puro: el archivo se lee y valida en el pool de procesos, no en el event loop
+        try:
+            lector = await pool_procesos.ejecutar(leer_personas_xlsx, ruta, settings.ASYNC_THRESHOLD)
+        except PoolSaturadoError as e:
+            return saturado_response(e)
         
         # Validar que las columnas requeridas existan
-        required = ['nombre', 'apellido', 'edad', 'correo', 'tipo_sangre']
-        headers_lower = [str(h).lower().strip() if h else '' for h in headers]
-        
-        for req in required:
-            if req not in headers_lower:
-                return error_response(
-                    titulo="Estructura Inválida",
-                    mensaje=f"Falta la columna requerida: {req}",
-                    errores=[f"Columnas encontradas: {', '.join(headers_lower)}"]
-                )
-        
-        # Crear mapeo de índices
-        indices = {col: headers_lower.index(col) for col in required}
-        
-        # Procesar filas (desde la fila 2)
-        for i, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            if all(cell is None for cell in row):
-                continue  # Fila vacía
-            
-            try:
-                persona = PersonaCreate(
-                    nombre=str(row[indices['nombre']]).strip(),
-                    apellido=str(row[indices['apellido']]).strip(),
-                    edad=int(row[indices['edad']]),
-                    correo=str(row[indices['correo']]).strip().lower(),
-                    tipo_sangre=str(row[indices['tipo_sangre']]).strip().upper()
-                )
-                personas.append(persona)
-            except Exception as e:
-                errores.append(f"Fila {i}: {str(e)}")
-        
-        if not personas:
+        if lector.columnas_faltantes:
             return error_response(
-                titulo="Sin Datos",
-                mensaje="No se encontraron datos válidos en el archivo",
-                errores=errores
+                titulo="Estructura Inválida",
+                mensaje=f"Falta la columna requerida: {lector.columnas_faltantes[0]}",
+                errores=[f"Columnas encontradas: {', '.join(lector.headers)}"]
             )
         
-        # Procesar personas
-        personas_creadas, duplicados = await PersonaService.bulk_create(db, personas)
+        # Archivos grandes: se delega a Celery y se responde de inmediato con el task_id
+        total_filas = lector.total_filas
+        asincrono = not lector.leida
+        historial = await HistorialService.create(db, HistorialCargaCreate(
+            nombre_archivo=file.filename,
+            total_registros=total_filas,
+            fue_asincrono=asincrono,
+            task_id=task_id,
+            hash_contenido=hash_contenido,
+            modo=mode.value,
+            # Solo las cargas asíncronas conservan el archivo para poder reanudarse
+            ruta_archivo=ruta if asincrono else None,
+            estado="pending" if asincrono else "processing"
+        ))
+        # El id se guarda aparte: un rollback de bulk_create expira el objeto historial
+        historial_id = historial.id
+        # Se registra antes de procesar para que un reenvío simultáneo retome esta carga
+        await UploadCacheService.set_carga(hash_contenido, mode, historial_id, task_id)
         
-        resultado = {
-            "total_procesados": len(personas),
-            "registros_exitosos": len(personas_creadas),
-            "registros_duplicados": len(duplicados),
-            "errores": errores
-        }
+        if asincrono:
+            procesar_archivo.apply_async(
+                kwargs={"ruta": ruta, "historial_id": historial.id, "modo": mode.value},
+                task_id=task_id
+            )
+            ruta = None  # La tarea borra el archivo al terminar
+            
+            return success_response(
+                titulo="Carga en Proceso",
+                mensaje=f"El archivo tiene {total_filas} registros y se procesará en segundo plano",
+                datos={
+                    "asincrono": True,
+                    "task_id": task_id,
+                    "historial_id": historial.id,
+                    "total_registros": total_filas
+                }
+            )
         
-        if duplicados:
-            resultado["detalles_duplicados"] = duplicados
+        await manager.notify_upload_start(file.filename, total_filas, task_id=task_id)
         
-        if errores:
-            return success_response(
-                titulo="Carga con Advertencias",
-                mensaje=f"Se cargaron {len(personas_creadas)} registros. {len(duplicados)} duplicados. {len(errores)} errores.",
-                datos=resultado
+        async def reportar(parcial):
+            await manager.notify_upload_progress(
+                task_id,
+                progress=int(lector.filas_leidas * 100 / total_filas) if total_filas else 100,
+                processed=lector.filas_leidas,
+                total=total_filas
             )
         
-        if duplicados:
-            return success_response(
-                titulo="Carga con Duplicados",
-                mensaje=f"Se cargaron {len(personas_creadas)} registros. {len(duplicados)} duplicados omitidos.",
-                datos=resultado
+        # Las personas ya validadas se insertan por bloques
+        try:
+            carga = await PersonaService.bulk_create(
+                db, lector.personas(), modo=mode, progreso=reportar
             )
+        except DuplicadosError as e:
+            await manager.notify_upload_error(file.filename, str(e), task_id=task_id)
+            await HistorialService.marcar_fallido(
+                db,
+                historial_id,
+                detalles_errores=[str(e)] + lector.errores,
+                detalles_duplicados=lector.con_fila(e.duplicados)
+            )
+            await UploadCacheService.invalidar_carga(hash_contenido, mode)
+            return duplicados_response(e, historial_id)
+    
+        await manager.notify_upload_complete(
+            file.filename,
+            exitosos=len(carga.ids_creados),
+            duplicados=len(carga.duplicados),
+            errores=len(lector.errores),
+            detalles_duplicados=carga.duplicados,
+            task_id=task_id
+        )
         
-        return success_response(
-            titulo="Carga Exitosa",
-            mensaje=f"Se cargaron {len(personas_creadas)} registros correctamente",
-            datos=resultado
+        await HistorialService.marcar_completado(
+            db,
+            historial_id,
+            registros_exitosos=len(carga.ids_creados),
+            registros_duplicados=len(carga.duplicados),
+            registros_error=len(lector.errores),
+            detalles_duplicados=lector.con_fila(carga.duplicados),
+            detalles_errores=lector.errores
+        )
+        
+        respuesta = resultado_response(carga, lector, task_id, historial_id)
+        await UploadCacheService.set_carga(
+            hash_contenido, mode, historial_id, task_id, respuesta=respuesta.model_dump(mode="json")
         )
+        return respuesta
         
     except Exception as e:
+        if historial_id is not None:
+            await db.rollback()
+            await HistorialService.marcar_fallido(db, historial_id, detalles_errores=[str(e)])
+            await UploadCacheService.invalidar_carga(hash_contenido, mode)
+        # Evento final para el cliente del WebSocket (también libera el control de progreso)
+        await manager.notify_upload_error(file.filename, str(e), task_id=task_id)
         return error_response(
             titulo="Error",
             mensaje="Error al procesar el archivo",
             errores=[str(e)]
         )
+    finally:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
 
 
 @router.post("/validate")
-async def validate_file(file: UploadFile = File(...)):
+async def validate_file(
+    file: UploadFile = File(...),
+    solo_invalidos: bool = Query(False, description="Devolver solo los registros inválidos (respuesta más liviana)")
+):
+    """
+    Valida estructura y registros sin insertar nada. El resultado se guarda en caché por
+    el SHA-256 del contenido, así validar dos veces el mismo archivo no lo vuelve a leer.
+    Devuelve todos los registros, que el frontend edita y envía a /process; con
+    `solo_invalidos` se omiten los válidos.
+    """
     if not file.filename.endswith(('.xlsx', '.xls')):
         return error_response(
             titulo="Archivo Inválido",
@@ -128,40 +348,90 @@ async def validate_file(file: UploadFile = File(...)):
             errores=["Extensión no válida"]
         )
     
-    return success_response(
-        titulo="Validación Exitosa",
-        mensaje="Archivo validado correctamente",
-        datos={"filename": file.filename}
-    )
+    ruta = None
+    try:
+        try:
+            ruta, hash_contenido = await guardar_upload(file)
+        except ArchivoDemasiadoGrandeError as e:
+            return error_response(
+                titulo="Archivo Demasiado Grande",
+                mensaje=str(e),
+                errores=["Tamaño de archivo no permitido"]
+            )
+        
+        validacion = await UploadCacheService.get_validacion(hash_contenido, solo_invalidos)
+        desde_cache = validacion is not None
+        if not desde_cache:
+            try:
+                validacion = await pool_procesos.ejecutar(validar_xlsx, ruta, not solo_invalidos)
+            except PoolSaturadoError as e:
+                return saturado_response(e)
+            await UploadCacheService.set_validacion(hash_contenido, validacion, solo_invalidos)
+        
+        return success_response(
+            titulo="Validación Exitosa" if validacion["archivo_valido"] and not validacion["registros_invalidos"] else "Validación con Errores",
+            mensaje=f"{validacion['registros_validos']} de {validacion['total_registros']} registros válidos",
+            datos={
+                "filename": file.filename,
+                "hash_contenido": hash_contenido,
+                "desde_cache": desde_cache,
+                **validacion
+            }
+        )
+    except Exception as e:
+        return error_response(
+            titulo="Error",
+            mensaje="Error al validar el archivo",
+            errores=[str(e)]
+        )
+    finally:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
 
 
 @router.post("/process")
 async def process_file(
     personas: List[PersonaCreate],
+    mode: ModoCarga = Query(ModoCarga.SKIP),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        personas_creadas, duplicados = await PersonaService.bulk_create(db, personas)
+        # Los modelos validados por FastAPI se pasan a la representación compacta de la carga
+        carga = await PersonaService.bulk_create(db, map(FilaPersona.desde_modelo, personas), modo=mode)
+        personas_creadas, duplicados = carga.ids_creados, carga.duplicados
+        
+        datos = {
+            "registros_exitosos": len(personas_creadas),
+            "registros_actualizados": carga.actualizados,
+            "registros_sin_cambios": carga.sin_cambios,
+            "registros_duplicados": len(duplicados)
+        }
         
         if duplicados:
             return success_response(
                 titulo="Carga Completada con Duplicados",
                 mensaje=f"Se cargaron {len(personas_creadas)} registros. {len(duplicados)} duplicados omitidos",
                 datos={
-                    "registros_exitosos": len(personas_creadas),
-                    "registros_duplicados": len(duplicados),
-                    "detalles_duplicados": duplicados
+                    **datos,
+                    "detalles_duplicados": duplicados[:settings.UPLOAD_REPORT_SAMPLES],
+                    "muestras_truncadas": len(duplicados) > settings.UPLOAD_REPORT_SAMPLES
                 }
             )
         
+        if carga.actualizados or carga.sin_cambios:
+            return success_response(
+                titulo="Carga con Actualizaciones",
+                mensaje=f"Se cargaron {len(personas_creadas)} registros. {carga.actualizados} actualizados, {carga.sin_cambios} sin cambios",
+                datos=datos
+            )
+        
         return success_response(
             titulo="Carga Exitosa",
             mensaje=f"Se cargaron {len(personas_creadas)} registros correctamente",
-            datos={
-                "registros_exitosos": len(personas_creadas),
-                "registros_duplicados": 0
-            }
+            datos=datos
         )
+    except DuplicadosError as e:
+        return duplicados_response(e)
     except Exception as e:
         return error_response(
             titulo="Error en Carga",
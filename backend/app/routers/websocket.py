@@ -1,10 +1,47 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.core.websocket_manager import manager
+from typing import Optional
 
 router = APIRouter(tags=["WebSocket"])
 
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    await websocket.send_json({"message": "Connected"})
-    await websocket.close()
+async def websocket_endpoint(websocket: WebSocket, task_id: Optional[str] = None):
+    """
+    Canal de notificaciones. El cliente puede suscribirse a una tarea al conectar
+    (`/api/ws?task_id=...`) o enviando {"action": "subscribe" | "unsubscribe", "task_id": "..."}.
+    """
+    await manager.connect(websocket)
+    if task_id:
+        manager.subscribe(websocket, task_id)
+    
+    try:
+        await manager.send_personal_message(
+            {"type": "connected", "data": {"message": "Connected", "task_id": task_id}},
+            websocket
+        )
+        
+        while True:
+            try:
+                mensaje = await websocket.receive_json()
+            except ValueError:
+                continue  # Mensaje que no es JSON
+            
+            accion = mensaje.get("action") if isinstance(mensaje, dict) else None
+            tarea = mensaje.get("task_id") if isinstance(mensaje, dict) else None
+            
+            if accion == "subscribe" and tarea:
+                manager.subscribe(websocket, tarea)
+            elif accion == "unsubscribe" and tarea:
+                manager.unsubscribe(websocket, tarea)
+            else:
+                continue
+            
+            await manager.send_personal_message(
+                {"type": f"{accion}d", "data": {"task_id": tarea}},
+                websocket
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(websocket)
@@ -0,0 +1,49 @@
+from pydantic import BaseModel
+from typing import Optional, Dict
+from datetime import datetime
+from enum import Enum
+
+
+class TipoDetalle(str, Enum):
+    DUPLICADOS = "duplicados"
+    ERRORES = "errores"
+
+
+class HistorialCargaCreate(BaseModel):
+    nombre_archivo: str
+    total_registros: int = 0
+    fue_asincrono: bool = False
+    task_id: Optional[str] = None
+    hash_contenido: Optional[str] = None
+    modo: Optional[str] = None
+    ruta_archivo: Optional[str] = None
+    estado: str
+
+
+class HistorialCargaUpdate(BaseModel):
+    total_registros: Optional[int] = None
+    registros_exitosos: Optional[int] = None
+    registros_duplicados: Optional[int] = None
+    registros_error: Optional[int] = None
+    estado: Optional[str] = None
+    completed_at: Optional[datetime] = None
+
+
+class HistorialCargaResponse(BaseModel):
+    id: int
+    nombre_archivo: str
+    total_registros: int
+    registros_exitosos: int
+    registros_duplicados: int
+    registros_error: int
+    fue_asincrono: Optional[bool] = None
+    task_id: Optional[str] = None
+    hash_contenido: Optional[str] = None
+    modo: Optional[str] = None
+    checkpoints: Optional[Dict[str, int]] = None
+    estado: str
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
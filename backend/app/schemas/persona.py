@@ -1,9 +1,22 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
+from enum import Enum
 from app.models.persona import TipoSangre
 
 
+class ModoCarga(str, Enum):
+    SKIP = "skip"
+    UPSERT = "upsert"
+    FAIL = "fail"
+
+
+class FormatoExportacion(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+    NDJSON = "ndjson"
+
+
 class PersonaBase(BaseModel):
     nombre: str = Field(..., min_length=1, max_length=100)
     apellido: str = Field(..., min_length=1, max_length=100)
@@ -22,3 +35,21 @@ class PersonaResponse(PersonaBase):
     
     class Config:
         from_attributes = True
+
+
+class PersonaValidacion(BaseModel):
+    fila: int
+    datos: Optional[PersonaBase] = None
+    valido: bool
+    errores: Optional[List[str]] = None
+
+
+class ValidacionArchivoResponse(BaseModel):
+    archivo_valido: bool
+    total_registros: int
+    registros_validos: int
+    registros_invalidos: int
+    columnas_esperadas: List[str]
+    columnas_encontradas: List[str]
+    registros: List[PersonaValidacion]
+    errores_estructura: Optional[List[str]] = None
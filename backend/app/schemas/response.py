@@ -1,3 +1,4 @@
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Any, Optional, List
 from enum import Enum
@@ -37,3 +38,29 @@ def error_response(titulo: str, mensaje: str, errores: List[str] = None) -> ApiR
         mensaje=mensaje,
         errores=errores
     )
+
+
+def fast_success_response(titulo: str, mensaje: str, datos: Any = None) -> ORJSONResponse:
+    """
+    Mismo sobre que success_response, serializado directamente con orjson.
+    Pensado para listados: `datos` debe contener solo tipos nativos (dict, list, datetime, Enum).
+    """
+    return ORJSONResponse({
+        "estado": True,
+        "tipo": ResponseType.SUCCESS.value,
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "datos": datos,
+        "errores": None
+    })
+
+
+def http_error_response(
+    status_code: int, titulo: str, mensaje: str, errores: List[str] = None, headers: Optional[dict] = None
+) -> ORJSONResponse:
+    """Mismo sobre que error_response, con un código HTTP distinto de 200 (p. ej. 429)"""
+    return ORJSONResponse(
+        error_response(titulo, mensaje, errores).model_dump(mode="json"),
+        status_code=status_code,
+        headers=headers
+    )
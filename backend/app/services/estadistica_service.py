@@ -0,0 +1,141 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from app.models.persona import Persona, TipoSangre
+from app.models.estadistica import EstadisticaPersona
+from app.core.config import settings
+from typing import List, Dict, Tuple, Optional, Iterable
+from collections import Counter
+
+Clave = Tuple[str, int]
+
+
+def rangos_edad(limites: List[int]) -> List[Tuple[str, int, Optional[int]]]:
+    """Convertir los límites superiores en (etiqueta, mínimo, máximo); el último rango no tiene máximo"""
+    rangos = []
+    minimo = 0
+    for limite in limites:
+        rangos.append((f"{minimo}-{limite}", minimo, limite))
+        minimo = limite + 1
+    rangos.append((f"{minimo}+", minimo, None))
+    return rangos
+
+
+def clave(tipo_sangre, edad: int) -> Clave:
+    return TipoSangre(tipo_sangre).value, int(edad)
+
+
+def resumir(cantidades: Dict[Clave, int]) -> Dict:
+    """Armar la respuesta de estadísticas a partir de las cantidades por (tipo de sangre, edad)"""
+    rangos = rangos_edad(settings.edad_rangos_list)
+    distribucion_sangre = Counter()
+    distribucion_edad = {etiqueta: 0 for etiqueta, _, _ in rangos}
+    total = 0
+    suma_edades = 0
+
+    for (tipo_sangre, edad), cantidad in cantidades.items():
+        if not cantidad:
+            continue
+        total += cantidad
+        suma_edades += edad * cantidad
+        distribucion_sangre[tipo_sangre] += cantidad
+        for etiqueta, minimo, maximo in rangos:
+            if edad >= minimo and (maximo is None or edad <= maximo):
+                distribucion_edad[etiqueta] += cantidad
+                break
+
+    return {
+        "total_personas": total,
+        "distribucion_tipo_sangre": {
+            tipo.value: distribucion_sangre[tipo.value]
+            for tipo in TipoSangre if distribucion_sangre[tipo.value]
+        },
+        "edad_promedio": round(suma_edades / total, 2) if total else 0.0,
+        "distribucion_edad": distribucion_edad
+    }
+
+
+class EstadisticaService:
+    """
+    Mantiene la tabla estadisticas_personas. Las cantidades se guardan por edad exacta
+    (a lo sumo 8 x 151 filas), así los rangos de EDAD_RANGOS se aplican al leer y
+    cambiarlos no obliga a reconstruir la tabla.
+    """
+
+    @staticmethod
+    def deltas(agregar: Iterable[Clave] = (), quitar: Iterable[Clave] = ()) -> Counter:
+        cambios = Counter(agregar)
+        cambios.subtract(quitar)
+        return cambios
+
+    @staticmethod
+    async def aplicar(db: AsyncSession, cambios: Counter):
+        """
+        Sumar los cambios a la tabla sin confirmar, dentro de la transacción del llamador.
+        Las claves se escriben ordenadas para que cargas concurrentes tomen los bloqueos
+        de fila en el mismo orden.
+        """
+        filas = [
+            {"tipo_sangre": tipo_sangre, "edad": edad, "cantidad": cantidad}
+            for (tipo_sangre, edad), cantidad in sorted(cambios.items()) if cantidad
+        ]
+        if not filas:
+            return
+
+        stmt = mysql_insert(EstadisticaPersona).values(filas)
+        stmt = stmt.on_duplicate_key_update({
+            "cantidad": EstadisticaPersona.cantidad + stmt.inserted.cantidad
+        })
+        await db.execute(stmt)
+
+    @staticmethod
+    async def get_cantidades(db: AsyncSession) -> Dict[Clave, int]:
+        result = await db.execute(
+            select(EstadisticaPersona.tipo_sangre, EstadisticaPersona.edad, EstadisticaPersona.cantidad)
+        )
+        return {(tipo_sangre, edad): cantidad for tipo_sangre, edad, cantidad in result.all() if cantidad}
+
+    @staticmethod
+    async def get_cantidades_en_vivo(db: AsyncSession) -> Dict[Clave, int]:
+        """Las mismas cantidades calculadas con un GROUP BY sobre personas"""
+        result = await db.execute(
+            select(Persona.tipo_sangre, Persona.edad, func.count(Persona.id))
+            .group_by(Persona.tipo_sangre, Persona.edad)
+        )
+        return {clave(tipo_sangre, edad): cantidad for tipo_sangre, edad, cantidad in result.all()}
+
+    @staticmethod
+    async def get_resumen(db: AsyncSession) -> Dict:
+        return resumir(await EstadisticaService.get_cantidades(db))
+
+    @staticmethod
+    async def reconstruir(db: AsyncSession) -> int:
+        """Recalcular la tabla desde cero; devuelve la cantidad de filas escritas"""
+        cantidades = await EstadisticaService.get_cantidades_en_vivo(db)
+        await db.execute(delete(EstadisticaPersona))
+        if cantidades:
+            await db.execute(
+                EstadisticaPersona.__table__.insert(),
+                [
+                    {"tipo_sangre": tipo_sangre, "edad": edad, "cantidad": cantidad}
+                    for (tipo_sangre, edad), cantidad in sorted(cantidades.items())
+                ]
+            )
+        await db.commit()
+        return len(cantidades)
+
+    @staticmethod
+    async def verificar(db: AsyncSession) -> List[Dict]:
+        """Comparar la tabla con el agregado en vivo; devuelve las diferencias encontradas"""
+        materializado = await EstadisticaService.get_cantidades(db)
+        en_vivo = await EstadisticaService.get_cantidades_en_vivo(db)
+        return [
+            {
+                "tipo_sangre": tipo_sangre,
+                "edad": edad,
+                "materializado": materializado.get((tipo_sangre, edad), 0),
+                "en_vivo": en_vivo.get((tipo_sangre, edad), 0)
+            }
+            for tipo_sangre, edad in sorted(set(materializado) | set(en_vivo))
+            if materializado.get((tipo_sangre, edad), 0) != en_vivo.get((tipo_sangre, edad), 0)
+        ]
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import openpyxl
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.models.persona import Persona
+from app.core.config import settings
+from app.schemas.historial import TipoDetalle
+from app.services.historial_service import HistorialService
+from app.services.xlsx_stream import COLUMNAS_REQUERIDAS
+from typing import AsyncIterator, List, Tuple
+
+COLUMNAS_EXPORTACION = ["id", "nombre", "apellido", "edad", "correo", "tipo_sangre", "created_at"]
+COLUMNAS_RECHAZADOS = ["fila", *COLUMNAS_REQUERIDAS, "motivo"]
+
+
+class ExportService:
+    """
+    Exportación de personas en streaming. Las filas se leen con un cursor del lado del
+    servidor en bloques de EXPORT_BATCH_SIZE, así la memoria no depende del tamaño de la tabla.
+    """
+
+    @staticmethod
+    async def _bloques(db: AsyncSession) -> AsyncIterator[List[Tuple]]:
+        columnas = [getattr(Persona, columna) for columna in COLUMNAS_EXPORTACION]
+        result = await db.stream(
+            select(*columnas)
+            .order_by(Persona.id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for particion in result.partitions():
+            yield [
+                (id, nombre, apellido, edad, correo, tipo_sangre.value, created_at)
+                for id, nombre, apellido, edad, correo, tipo_sangre, created_at in particion
+            ]
+
+    @staticmethod
+    async def csv(db: AsyncSession) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNAS_EXPORTACION)
+
+        async for bloque in ExportService._bloques(db):
+            writer.writerows(
+                (*fila[:-1], fila[-1].isoformat() if fila[-1] else "") for fila in bloque
+            )
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    async def ndjson(db: AsyncSession) -> AsyncIterator[bytes]:
+        async for bloque in ExportService._bloques(db):
+            yield "".join(
+                json.dumps(
+                    dict(zip(COLUMNAS_EXPORTACION, (*fila[:-1], fila[-1].isoformat() if fila[-1] else None))),
+                    ensure_ascii=False
+                ) + "\n"
+                for fila in bloque
+            ).encode("utf-8")
+
+    @staticmethod
+    async def xlsx(db: AsyncSession) -> AsyncIterator[bytes]:
+        """
+        XLSX en modo write-only: openpyxl guarda las filas en un archivo temporal y el
+        ZIP final solo puede armarse al terminar, por eso los bytes salen después de la
+        última fila (la memoria sigue siendo constante).
+        """
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Personas")
+        sheet.append(COLUMNAS_EXPORTACION)
+
+        def agregar(bloque: List[Tuple]):
+            for fila in bloque:
+                # openpyxl no admite fechas con zona horaria
+                created_at = fila[-1].replace(tzinfo=None) if fila[-1] else None
+                sheet.append((*fila[:-1], created_at))
+
+        async for bloque in ExportService._bloques(db):
+            await run_in_threadpool(agregar, bloque)
+
+        async for bloque in ExportService._guardar_xlsx(workbook):
+            yield bloque
+
+    @staticmethod
+    async def rechazados(db: AsyncSession, historial_id: int) -> AsyncIterator[bytes]:
+        """
+        XLSX con las filas rechazadas de una carga (errores de validación y luego duplicados),
+        con sus valores originales y el motivo, para corregirlas y volver a subirlas.
+        Los detalles se leen por páginas de EXPORT_BATCH_SIZE.
+        """
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Rechazados")
+        sheet.append(COLUMNAS_RECHAZADOS)
+
+        def agregar(detalles: List):
+            for detalle in detalles:
+                if not isinstance(detalle, dict):
+                    # Detalles guardados como texto (errores generales o formato anterior)
+                    sheet.append((None,) * (len(COLUMNAS_RECHAZADOS) - 1) + (str(detalle),))
+                    continue
+                valores = detalle.get("valores") or {}
+                sheet.append((
+                    detalle.get("fila"),
+                    *(valores.get(columna) for columna in COLUMNAS_REQUERIDAS),
+                    detalle.get("mensaje")
+                ))
+
+        for tipo in (TipoDetalle.ERRORES, TipoDetalle.DUPLICADOS):
+            cursor = None
+            while True:
+                detalles, cursor = await HistorialService.get_detalles(
+                    db, historial_id, tipo, limit=settings.EXPORT_BATCH_SIZE, cursor=cursor
+                )
+                await run_in_threadpool(agregar, detalles)
+                if cursor is None:
+                    break
+
+        async for bloque in ExportService._guardar_xlsx(workbook):
+            yield bloque
+
+    @staticmethod
+    async def _guardar_xlsx(workbook: openpyxl.Workbook) -> AsyncIterator[bytes]:
+        fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            await run_in_threadpool(workbook.save, ruta)
+            with open(ruta, "rb") as archivo:
+                while bloque := await run_in_threadpool(archivo.read, settings.UPLOAD_SPOOL_CHUNK_SIZE):
+                    yield bloque
+        finally:
+            os.remove(ruta)
@@ -1,10 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.historial import HistorialCarga
-from app.schemas.historial import HistorialCargaCreate, HistorialCargaUpdate
-from typing import List, Optional
+from sqlalchemy import select, update, insert, func
+from app.models.historial import HistorialCarga, HistorialDetalle
+from app.schemas.historial import HistorialCargaCreate, HistorialCargaUpdate, HistorialCargaResponse, TipoDetalle
+from app.core.pagination import paginar_keyset
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 
+DETALLES_POR_PAGINA = 100
+
 
 class HistorialService:
     
@@ -19,9 +22,11 @@ class HistorialService:
     
     @staticmethod
     async def get_by_id(db: AsyncSession, historial_id: int) -> Optional[HistorialCarga]:
-        """Obtener historial por ID"""
+        """Obtener historial por ID (relee la fila aunque ya esté en la sesión)"""
         result = await db.execute(
-            select(HistorialCarga).where(HistorialCarga.id == historial_id)
+            select(HistorialCarga)
+            .where(HistorialCarga.id == historial_id)
+            .execution_options(populate_existing=True)
         )
         return result.scalar_one_or_none()
     
@@ -29,10 +34,23 @@ class HistorialService:
     async def get_by_task_id(db: AsyncSession, task_id: str) -> Optional[HistorialCarga]:
         """Obtener historial por task_id de Celery"""
         result = await db.execute(
-            select(HistorialCarga).where(HistorialCarga.task_id == task_id)
+            select(HistorialCarga)
+            .where(HistorialCarga.task_id == task_id)
+            .execution_options(populate_existing=True)
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_estados_por_ruta(db: AsyncSession, rutas: List[str]) -> Dict[str, str]:
+        """Estado de las cargas que conservan su archivo en alguna de `rutas`"""
+        if not rutas:
+            return {}
+        result = await db.execute(
+            select(HistorialCarga.ruta_archivo, HistorialCarga.estado)
+            .where(HistorialCarga.ruta_archivo.in_(rutas))
+        )
+        return {ruta: estado for ruta, estado in result.all()}
+    
     @staticmethod
     async def get_all(
         db: AsyncSession, 
@@ -44,61 +62,160 @@ class HistorialService:
             select(HistorialCarga)
             .offset(skip)
             .limit(limit)
-            .order_by(HistorialCarga.created_at.desc())
+            .order_by(HistorialCarga.created_at.desc(), HistorialCarga.id.desc())
         )
         return result.scalars().all()
     
+    @staticmethod
+    async def get_page(
+        db: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Página del historial por cursor como diccionarios con los campos de HistorialCargaResponse"""
+        columnas = [getattr(HistorialCarga, campo) for campo in HistorialCargaResponse.model_fields]
+        filas, next_cursor = await paginar_keyset(db, select(*columnas), HistorialCarga, limit, cursor, skip)
+        return [fila._asdict() for fila in filas], next_cursor
+    
+    @staticmethod
+    async def _actualizar(db: AsyncSession, condicion, valores: Dict[str, Any]) -> bool:
+        """Un único UPDATE sin leer la fila antes; devuelve si encontró alguna"""
+        result = await db.execute(
+            update(HistorialCarga)
+            .where(condicion)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount > 0
+    
     @staticmethod
     async def update(
         db: AsyncSession, 
         historial_id: int, 
         historial_data: HistorialCargaUpdate
-    ) -> Optional[HistorialCarga]:
+    ) -> bool:
         """Actualizar registro de historial"""
-        historial = await HistorialService.get_by_id(db, historial_id)
-        if historial:
-            for key, value in historial_data.model_dump(exclude_unset=True).items():
-                setattr(historial, key, value)
-            await db.commit()
-            await db.refresh(historial)
-        return historial
+        return await HistorialService._actualizar(
+            db, HistorialCarga.id == historial_id, historial_data.model_dump(exclude_unset=True)
+        )
     
     @staticmethod
     async def update_by_task_id(
         db: AsyncSession,
         task_id: str,
         historial_data: HistorialCargaUpdate
-    ) -> Optional[HistorialCarga]:
+    ) -> bool:
         """Actualizar registro por task_id"""
-        historial = await HistorialService.get_by_task_id(db, task_id)
-        if historial:
-            for key, value in historial_data.model_dump(exclude_unset=True).items():
-                setattr(historial, key, value)
-            await db.commit()
-            await db.refresh(historial)
-        return historial
+        return await HistorialService._actualizar(
+            db, HistorialCarga.task_id == task_id, historial_data.model_dump(exclude_unset=True)
+        )
+    
+    @staticmethod
+    async def agregar_detalles(
+        db: AsyncSession,
+        historial_id: int,
+        tipo: TipoDetalle,
+        detalles: List[Any]
+    ) -> None:
+        """Insertar duplicados o errores en historial_detalles, sin confirmar"""
+        if detalles:
+            await db.execute(
+                insert(HistorialDetalle),
+                [{"historial_id": historial_id, "tipo": tipo.value, "datos": datos} for datos in detalles]
+            )
+    
+    @staticmethod
+    async def get_detalles(
+        db: AsyncSession,
+        historial_id: int,
+        tipo: TipoDetalle,
+        limit: int = DETALLES_POR_PAGINA,
+        cursor: Optional[int] = None
+    ) -> Tuple[List[Any], Optional[int]]:
+        """Página de detalles en orden de inserción; el cursor es el id del último de la página"""
+        query = (
+            select(HistorialDetalle.id, HistorialDetalle.datos)
+            .where(HistorialDetalle.historial_id == historial_id, HistorialDetalle.tipo == tipo.value)
+        )
+        if cursor is not None:
+            query = query.where(HistorialDetalle.id > cursor)
+        result = await db.execute(query.order_by(HistorialDetalle.id).limit(limit + 1))
+        filas = result.all()
+        
+        next_cursor = filas[limit - 1].id if len(filas) > limit else None
+        return [fila.datos for fila in filas[:limit]], next_cursor
+    
+    @staticmethod
+    async def contar_detalles(db: AsyncSession, historial_id: int) -> Dict[str, int]:
+        """Cantidad de detalles de cada tipo"""
+        result = await db.execute(
+            select(HistorialDetalle.tipo, func.count(HistorialDetalle.id))
+            .where(HistorialDetalle.historial_id == historial_id)
+            .group_by(HistorialDetalle.tipo)
+        )
+        cantidades = dict(result.all())
+        return {tipo.value: cantidades.get(tipo.value, 0) for tipo in TipoDetalle}
+    
+    @staticmethod
+    async def registrar_checkpoint(
+        db: AsyncSession,
+        historial_id: int,
+        origen: str,
+        filas_confirmadas: int,
+        registros_exitosos: int = 0,
+        registros_duplicados: int = 0,
+        registros_error: int = 0
+    ) -> None:
+        """
+        Sumar a los contadores y guardar las filas confirmadas de `origen` con un único
+        UPDATE atómico (seguro entre tareas concurrentes). No confirma: se llama antes del
+        commit de cada bloque para que el checkpoint y las filas se guarden juntos.
+        """
+        await db.execute(
+            update(HistorialCarga)
+            .where(HistorialCarga.id == historial_id)
+            .values(
+                registros_exitosos=HistorialCarga.registros_exitosos + registros_exitosos,
+                registros_duplicados=HistorialCarga.registros_duplicados + registros_duplicados,
+                registros_error=HistorialCarga.registros_error + registros_error,
+                checkpoints=func.json_set(
+                    func.coalesce(HistorialCarga.checkpoints, func.json_object()),
+                    f'$."{origen}"',
+                    filas_confirmadas
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
     
     @staticmethod
     async def marcar_completado(
         db: AsyncSession,
         historial_id: int,
-        registros_exitosos: int,
-        registros_duplicados: int,
-        registros_error: int,
-        detalles_duplicados: Optional[dict] = None,
-        detalles_errores: Optional[dict] = None
-    ) -> Optional[HistorialCarga]:
-        """Marcar una carga como completada"""
+        registros_exitosos: Optional[int] = None,
+        registros_duplicados: Optional[int] = None,
+        registros_error: Optional[int] = None,
+        detalles_duplicados: Optional[List[Dict]] = None,
+        detalles_errores: Optional[List[str]] = None
+    ) -> bool:
+        """
+        Marcar una carga como completada; los contadores omitidos conservan lo acumulado
+        por checkpoints y los detalles se agregan a historial_detalles en la misma transacción.
+        """
+        contadores = {
+            "registros_exitosos": registros_exitosos,
+            "registros_duplicados": registros_duplicados,
+            "registros_error": registros_error,
+        }
+        await HistorialService.agregar_detalles(db, historial_id, TipoDetalle.DUPLICADOS, detalles_duplicados)
+        await HistorialService.agregar_detalles(db, historial_id, TipoDetalle.ERRORES, detalles_errores)
         return await HistorialService.update(
             db,
             historial_id,
             HistorialCargaUpdate(
                 estado="completed",
-                registros_exitosos=registros_exitosos,
-                registros_duplicados=registros_duplicados,
-                registros_error=registros_error,
-                detalles_duplicados=detalles_duplicados,
-                detalles_errores=detalles_errores,
+                **{campo: valor for campo, valor in contadores.items() if valor is not None},
                 completed_at=datetime.utcnow()
             )
         )
@@ -107,15 +224,17 @@ class HistorialService:
     async def marcar_fallido(
         db: AsyncSession,
         historial_id: int,
-        detalles_errores: dict
-    ) -> Optional[HistorialCarga]:
+        detalles_errores: List[str],
+        detalles_duplicados: Optional[List[Dict]] = None
+    ) -> bool:
         """Marcar una carga como fallida"""
+        await HistorialService.agregar_detalles(db, historial_id, TipoDetalle.DUPLICADOS, detalles_duplicados)
+        await HistorialService.agregar_detalles(db, historial_id, TipoDetalle.ERRORES, detalles_errores)
         return await HistorialService.update(
             db,
             historial_id,
             HistorialCargaUpdate(
                 estado="failed",
-                detalles_errores=detalles_errores,
                 completed_at=datetime.utcnow()
             )
-        )
\ No newline at end of file
+        )
@@ -1,8 +1,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.models.persona import Persona
-from app.schemas.persona import PersonaCreate
-from typing import List, Dict, Tuple, Optional
+from sqlalchemy import select, func, insert, case
+from sqlalchemy.dialects.mysql import insert as mysql_insert, match as mysql_match
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.models.persona import Persona, TipoSangre
+from app.schemas.persona import PersonaCreate, ModoCarga
+from app.core.config import settings
+from app.core.pagination import paginar_keyset
+from app.core.metrics import medir_etapa
+from app.services.estadistica_service import EstadisticaService, rangos_edad, clave
+from app.services.validacion_rapida import FilaPersona
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Set, Callable, Awaitable
+from dataclasses import dataclass, field
+from itertools import islice
+import re
+
+CAMPOS_ACTUALIZABLES = ("nombre", "apellido", "edad", "tipo_sangre")
+# Errores de MySQL que se resuelven reintentando la transacción: espera de bloqueo agotada, deadlock
+CODIGOS_BLOQUEO = {1205, 1213}
+# Campos de PersonaResponse, en el mismo orden
+CAMPOS_RESPUESTA = ("nombre", "apellido", "edad", "correo", "tipo_sangre", "id", "created_at")
+
+
+def _terminos_fulltext(texto: str) -> str:
+    """Convertir texto libre en una consulta BOOLEAN MODE: todas las palabras, como prefijo"""
+    return " ".join(f"+{palabra}*" for palabra in re.findall(r"\w+", texto))
+
+
+def _en_bloques(iterable: Iterable, size: int) -> Iterator[List]:
+    """Agrupar un iterable en listas de tamaño máximo `size`"""
+    iterator = iter(iterable)
+    while bloque := list(islice(iterator, size)):
+        yield bloque
+
+
+def _es_bloqueo(error: OperationalError) -> bool:
+    return bool(getattr(error.orig, "args", None)) and error.orig.args[0] in CODIGOS_BLOQUEO
+
+
+@dataclass
+class ResultadoCarga:
+    ids_creados: List[int] = field(default_factory=list)
+    actualizados: int = 0
+    sin_cambios: int = 0
+    duplicados: List[Dict] = field(default_factory=list)
+    # Duplicados contados pero no conservados en `duplicados` (ver max_duplicados de bulk_create)
+    duplicados_omitidos: int = 0
+    
+    @property
+    def total_duplicados(self) -> int:
+        return len(self.duplicados) + self.duplicados_omitidos
+
+
+class DuplicadosError(Exception):
+    """Carga cancelada en modo `fail` por encontrar duplicados"""
+    
+    def __init__(self, duplicados: List[Dict]):
+        self.duplicados = duplicados
+        super().__init__(f"Se encontraron {len(duplicados)} correos duplicados")
 
 
 class PersonaService:
@@ -11,10 +65,27 @@ class PersonaService:
     async def create(db: AsyncSession, persona_data: PersonaCreate) -> Persona:
         persona = Persona(**persona_data.model_dump())
         db.add(persona)
+        await EstadisticaService.aplicar(
+            db, EstadisticaService.deltas(agregar=[clave(persona.tipo_sangre, persona.edad)])
+        )
         await db.commit()
         await db.refresh(persona)
         return persona
     
+    @staticmethod
+    async def delete(db: AsyncSession, persona_id: int) -> bool:
+        result = await db.execute(select(Persona).where(Persona.id == persona_id))
+        persona = result.scalar_one_or_none()
+        if persona is None:
+            return False
+        
+        await db.delete(persona)
+        await EstadisticaService.aplicar(
+            db, EstadisticaService.deltas(quitar=[clave(persona.tipo_sangre, persona.edad)])
+        )
+        await db.commit()
+        return True
+    
     @staticmethod
     async def get_by_email(db: AsyncSession, correo: str) -> Optional[Persona]:
         result = await db.execute(
@@ -28,81 +99,322 @@ class PersonaService:
             select(Persona)
             .offset(skip)
             .limit(limit)
-            .order_by(Persona.created_at.desc())
+            .order_by(Persona.created_at.desc(), Persona.id.desc())
         )
         return result.scalars().all()
     
     @staticmethod
-    async def bulk_create(db: AsyncSession, personas_data: List[PersonaCreate]) -> Tuple[List[Persona], List[Dict]]:
-        personas_creadas = []
-        duplicados = []
+    async def get_page(
+        db: AsyncSession,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Página de personas por cursor como diccionarios con los campos de PersonaResponse.
+        Solo se seleccionan las columnas necesarias, sin construir objetos ORM.
+        """
+        columnas = [getattr(Persona, campo) for campo in CAMPOS_RESPUESTA]
+        filas, next_cursor = await paginar_keyset(db, select(*columnas), Persona, limit, cursor, skip)
+        return [fila._asdict() for fila in filas], next_cursor
+    
+    @staticmethod
+    async def search(
+        db: AsyncSession,
+        q: Optional[str] = None,
+        correo: Optional[str] = None,
+        dominio: Optional[str] = None,
+        tipo_sangre: Optional[TipoSangre] = None,
+        edad_min: Optional[int] = None,
+        edad_max: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Buscar personas combinando filtros, cada uno respaldado por un índice:
+        - q: palabras (o prefijos) en nombre/apellido, índice FULLTEXT
+        - correo / dominio: prefijo del correo o de su dominio, índices B-tree
+        - tipo_sangre y rango de edad: índice compuesto (tipo_sangre, edad)
+        """
+        columnas = [getattr(Persona, campo) for campo in CAMPOS_RESPUESTA]
+        query = select(*columnas)
         
-        for idx, persona_data in enumerate(personas_data):
-            existing = await PersonaService.get_by_email(db, persona_data.correo)
-            
-            if existing:
-                duplicados.append({
-                    "indice": idx,
-                    "correo": persona_data.correo,
-                    "nombre_completo": f"{persona_data.nombre} {persona_data.apellido}",
-                    "mensaje": "Correo ya registrado en la base de datos"
-                })
+        if q and (terminos := _terminos_fulltext(q)):
+            query = query.where(
+                mysql_match(Persona.nombre, Persona.apellido, against=terminos).in_boolean_mode()
+            )
+        if correo:
+            query = query.where(Persona.correo.startswith(correo.strip().lower(), autoescape=True))
+        if dominio:
+            query = query.where(
+                Persona.correo_dominio.startswith(dominio.strip().lower().lstrip("@"), autoescape=True)
+            )
+        if tipo_sangre:
+            query = query.where(Persona.tipo_sangre == tipo_sangre)
+        if edad_min is not None:
+            query = query.where(Persona.edad >= edad_min)
+        if edad_max is not None:
+            query = query.where(Persona.edad <= edad_max)
+        
+        filas, next_cursor = await paginar_keyset(db, query, Persona, limit, cursor)
+        return [fila._asdict() for fila in filas], next_cursor
+    
+    @staticmethod
+    async def get_existing(
+        db: AsyncSession,
+        correos: Iterable[str],
+        chunk_size: Optional[int] = None,
+        bloquear: bool = False
+    ) -> Dict[str, Tuple]:
+        """
+        Obtener los campos actualizables de los correos ya registrados, por bloques IN (...).
+        Con `bloquear` la lectura es SELECT ... FOR UPDATE: hasta el commit nadie modifica
+        esas filas ni inserta esos correos, así lo leído es lo que el UPSERT va a escribir.
+        """
+        chunk_size = chunk_size or settings.DUPLICATE_CHECK_CHUNK_SIZE
+        columnas = [getattr(Persona, campo) for campo in CAMPOS_ACTUALIZABLES]
+        correos = list(correos)
+        existentes = {}
+        
+        for inicio in range(0, len(correos), chunk_size):
+            bloque = correos[inicio:inicio + chunk_size]
+            query = select(Persona.correo, *columnas).where(Persona.correo.in_(bloque))
+            result = await db.execute(query.with_for_update() if bloquear else query)
+            for correo, *valores in result.all():
+                existentes[correo.lower()] = tuple(valores)
+        
+        return existentes
+    
+    @staticmethod
+    async def get_existing_emails(
+        db: AsyncSession,
+        correos: Iterable[str],
+        chunk_size: Optional[int] = None
+    ) -> Set[str]:
+        """Obtener los correos ya registrados usando consultas IN (...) por bloques"""
+        chunk_size = chunk_size or settings.DUPLICATE_CHECK_CHUNK_SIZE
+        correos = list(correos)
+        existentes = set()
+        
+        for inicio in range(0, len(correos), chunk_size):
+            bloque = correos[inicio:inicio + chunk_size]
+            result = await db.execute(
+                select(Persona.correo).where(Persona.correo.in_(bloque))
+            )
+            existentes.update(correo.lower() for correo in result.scalars().all())
+        
+        return existentes
+    
+    @staticmethod
+    async def bulk_insert(
+        db: AsyncSession,
+        filas: List[Dict],
+        actualizar_existentes: bool = False
+    ) -> Dict[str, int]:
+        """Insertar un bloque con un único INSERT multi-fila y devolver los IDs por correo"""
+        if not filas:
+            return {}
+        
+        if actualizar_existentes:
+            # INSERT ... ON DUPLICATE KEY UPDATE sobre el índice único ix_personas_correo
+            stmt = mysql_insert(Persona).values(filas)
+            # onupdate no se aplica en ON DUPLICATE KEY UPDATE, se fija updated_at explícitamente
+            stmt = stmt.on_duplicate_key_update({
+                **{campo: stmt.inserted[campo] for campo in CAMPOS_ACTUALIZABLES},
+                "updated_at": func.now()
+            })
+        else:
+            stmt = insert(Persona).values(filas)
+        await db.execute(stmt)
+        
+        # Un solo SELECT por bloque en lugar de un refresh por fila
+        result = await db.execute(
+            select(Persona.correo, Persona.id)
+            .where(Persona.correo.in_([fila["correo"] for fila in filas]))
+        )
+        return {correo.lower(): persona_id for correo, persona_id in result.all()}
+    
+    @staticmethod
+    async def _procesar_bloque(
+        db: AsyncSession,
+        bloque: List[Tuple[int, FilaPersona]],
+        vistos: Set[str],
+        modo: ModoCarga,
+        escribir: bool = True
+    ) -> Tuple[ResultadoCarga, Set[str]]:
+        """Clasificar e insertar un bloque; devuelve el resultado parcial y los correos aceptados"""
+        parcial = ResultadoCarga()
+        aceptados = set()
+        correos = [persona_data.correo.lower() for _, persona_data in bloque]
+        pendientes = set(correos) - vistos
+        with medir_etapa("busqueda_duplicados", len(pendientes)):
+            if modo == ModoCarga.UPSERT:
+                existentes = await PersonaService.get_existing(db, pendientes, bloquear=escribir)
             else:
-                persona = Persona(**persona_data.model_dump())
-                db.add(persona)
-                personas_creadas.append(persona)
+                existentes = await PersonaService.get_existing_emails(db, pendientes)
+        nuevos = []
+        filas = []
+        reemplazados = []
         
-        if personas_creadas:
-            await db.commit()
-            for persona in personas_creadas:
-                await db.refresh(persona)
+        for (idx, persona_data), correo in zip(bloque, correos):
+            if correo in vistos or correo in aceptados:
+                mensaje = "Correo duplicado dentro del archivo"
+            elif correo in existentes and modo != ModoCarga.UPSERT:
+                mensaje = "Correo ya registrado en la base de datos"
+            else:
+                aceptados.add(correo)
+                fila = {**persona_data.parametros(), "correo": correo, "correo_dominio": correo.rsplit("@", 1)[-1]}
+                if correo not in existentes:
+                    nuevos.append(correo)
+                elif existentes[correo] == tuple(fila[campo] for campo in CAMPOS_ACTUALIZABLES):
+                    parcial.sin_cambios += 1
+                    continue
+                else:
+                    parcial.actualizados += 1
+                    reemplazados.append(existentes[correo])
+                filas.append(fila)
+                continue
+            
+            parcial.duplicados.append({
+                "indice": idx,
+                "correo": persona_data.correo,
+                "nombre_completo": f"{persona_data.nombre} {persona_data.apellido}",
+                "mensaje": mensaje,
+                "valores": persona_data.valores_json()
+            })
         
-        return personas_creadas, duplicados
+        if filas and escribir:
+            with medir_etapa("insercion", len(filas)):
+                ids = await PersonaService.bulk_insert(
+                    db, filas, actualizar_existentes=modo == ModoCarga.UPSERT
+                )
+                parcial.ids_creados.extend(ids[correo] for correo in nuevos)
+                
+                # Mismo commit que el INSERT: el resumen nunca queda desfasado del bloque. Los
+                # valores reemplazados son los que escribe el INSERT: en upsert se leyeron con
+                # FOR UPDATE y en skip un correo insertado por otra carga revierte el bloque
+                await EstadisticaService.aplicar(db, EstadisticaService.deltas(
+                    agregar=[clave(fila["tipo_sangre"], fila["edad"]) for fila in filas],
+                    quitar=[clave(tipo_sangre, edad) for _, _, edad, tipo_sangre in reemplazados]
+                ))
+        
+        return parcial, aceptados
+    
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession,
+        personas_data: Iterable[FilaPersona],
+        chunk_size: Optional[int] = None,
+        modo: ModoCarga = ModoCarga.SKIP,
+        progreso: Optional[Callable[[ResultadoCarga], Awaitable[None]]] = None,
+        al_confirmar: Optional[Callable[[ResultadoCarga], Awaitable[None]]] = None,
+        max_duplicados: Optional[int] = None
+    ) -> ResultadoCarga:
+        """
+        Insertar personas por bloques, confirmando cada bloque en su propia transacción.
+        
+        - skip: los correos existentes se reportan como duplicados y se omiten
+        - upsert: los correos existentes se actualizan (o se cuentan sin cambios)
+        - fail: cualquier duplicado cancela la carga completa (una sola transacción)
+        
+        Si otra carga concurrente inserta el mismo correo entre la consulta y el INSERT,
+        el índice único lo rechaza y el bloque se reintenta con los duplicados actualizados.
+        En upsert el INSERT no falla por duplicados: la consulta bloquea los correos del
+        bloque (FOR UPDATE) y, si dos cargas se cruzan, el deadlock también se reintenta.
+        
+        `progreso`, si se indica, se espera después de cada bloque con el resultado parcial.
+        `al_confirmar` se espera con el resultado de cada bloque justo antes de su commit
+        (fuera del modo fail), para escribir un checkpoint en la misma transacción.
+        `max_duplicados` limita los duplicados que se conservan en el resultado cuando
+        `al_confirmar` ya los guarda (fuera del modo fail); el resto solo se cuenta.
+        """
+        chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+        resultado = ResultadoCarga()
+        vistos = set()
+        
+        for bloque in _en_bloques(enumerate(personas_data), chunk_size):
+            for intento in range(settings.BULK_INSERT_MAX_RETRIES + 1):
+                try:
+                    # En modo fail, tras el primer duplicado solo se sigue recorriendo para reportarlos todos
+                    parcial, aceptados = await PersonaService._procesar_bloque(
+                        db, bloque, vistos, modo,
+                        escribir=not (modo == ModoCarga.FAIL and resultado.duplicados)
+                    )
+                    if modo != ModoCarga.FAIL:
+                        if al_confirmar:
+                            await al_confirmar(parcial)
+                        with medir_etapa("commit", len(bloque)):
+                            await db.commit()
+                    break
+                except (IntegrityError, OperationalError) as e:
+                    await db.rollback()
+                    if isinstance(e, OperationalError) and not _es_bloqueo(e):
+                        raise
+                    if modo == ModoCarga.FAIL or intento == settings.BULK_INSERT_MAX_RETRIES:
+                        raise
+            
+            vistos.update(aceptados)
+            resultado.ids_creados.extend(parcial.ids_creados)
+            resultado.actualizados += parcial.actualizados
+            resultado.sin_cambios += parcial.sin_cambios
+            conservados = parcial.duplicados
+            if max_duplicados is not None and modo != ModoCarga.FAIL:
+                conservados = conservados[:max(max_duplicados - len(resultado.duplicados), 0)]
+            resultado.duplicados.extend(conservados)
+            resultado.duplicados_omitidos += len(parcial.duplicados) - len(conservados)
+            
+            if progreso:
+                await progreso(resultado)
+        
+        if modo == ModoCarga.FAIL:
+            if resultado.duplicados:
+                await db.rollback()
+                raise DuplicadosError(resultado.duplicados)
+            with medir_etapa("commit", len(resultado.ids_creados)):
+                await db.commit()
+        
+        return resultado
     
     @staticmethod
     async def get_statistics(db: AsyncSession) -> Dict:
-        # Total de personas
-        total_result = await db.execute(select(func.count(Persona.id)))
-        total = total_result.scalar()
-        
-        # Distribución por tipo de sangre
-        tipo_sangre_result = await db.execute(
-            select(Persona.tipo_sangre, func.count(Persona.id))
-            .group_by(Persona.tipo_sangre)
-        )
-        distribucion_sangre = {
-            str(tipo): count for tipo, count in tipo_sangre_result.all()
-        }
+        """Estadísticas leídas de la tabla materializada estadisticas_personas"""
+        return await EstadisticaService.get_resumen(db)
+    
+    @staticmethod
+    async def get_live_statistics(db: AsyncSession) -> Dict:
+        """Todas las estadísticas en una sola consulta agregada sobre personas"""
+        def contar(condicion):
+            return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
         
-        # Edad promedio
-        edad_promedio_result = await db.execute(select(func.avg(Persona.edad)))
-        edad_promedio = edad_promedio_result.scalar() or 0
-        
-        # Distribución por rangos de edad
-        personas = await PersonaService.get_all(db, limit=10000)
-        edad_rangos = {
-            "0-18": 0,
-            "19-30": 0,
-            "31-45": 0,
-            "46-60": 0,
-            "61+": 0
-        }
+        rangos = rangos_edad(settings.edad_rangos_list)
+        columnas = [
+            func.count(Persona.id).label("total"),
+            func.avg(Persona.edad).label("edad_promedio"),
+        ]
+        columnas += [
+            contar(Persona.tipo_sangre == tipo).label(f"sangre_{i}")
+            for i, tipo in enumerate(TipoSangre)
+        ]
+        columnas += [
+            contar(Persona.edad >= minimo if maximo is None else Persona.edad.between(minimo, maximo)).label(f"edad_{i}")
+            for i, (_, minimo, maximo) in enumerate(rangos)
+        ]
         
-        for persona in personas:
-            if persona.edad <= 18:
-                edad_rangos["0-18"] += 1
-            elif persona.edad <= 30:
-                edad_rangos["19-30"] += 1
-            elif persona.edad <= 45:
-                edad_rangos["31-45"] += 1
-            elif persona.edad <= 60:
-                edad_rangos["46-60"] += 1
-            else:
-                edad_rangos["61+"] += 1
+        fila = (await db.execute(select(*columnas))).one()
+        
+        # Solo los tipos de sangre presentes, como en el GROUP BY anterior
+        distribucion_sangre = {
+            tipo.value: int(getattr(fila, f"sangre_{i}"))
+            for i, tipo in enumerate(TipoSangre)
+            if getattr(fila, f"sangre_{i}")
+        }
         
         return {
-            "total_personas": total,
+            "total_personas": fila.total,
             "distribucion_tipo_sangre": distribucion_sangre,
-            "edad_promedio": round(edad_promedio, 2),
-            "distribucion_edad": edad_rangos
+            "edad_promedio": round(float(fila.edad_promedio or 0), 2),
+            "distribucion_edad": {
+                etiqueta: int(getattr(fila, f"edad_{i}"))
+                for i, (etiqueta, _, _) in enumerate(rangos)
+            }
         }
@@ -0,0 +1,75 @@
+import json
+import logging
+from app.core.cache import create_cache_backend
+from app.core.config import settings
+from app.schemas.persona import ModoCarga
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Instancia global de la caché de archivos subidos
+cache = create_cache_backend("xlsx_loader:uploads")
+
+
+class UploadCacheService:
+    """
+    Resultados de validación y de carga indexados por el SHA-256 del archivo.
+    La carga se guarda por modo, ya que el mismo archivo da resultados distintos en skip/upsert/fail.
+    """
+    
+    @staticmethod
+    async def _guardar(key: str, value: Dict[str, Any]):
+        if len(json.dumps(value, default=str)) > settings.UPLOAD_CACHE_MAX_ENTRY_BYTES:
+            return
+        try:
+            await cache.set(key, value, ttl=settings.UPLOAD_CACHE_TTL)
+        except Exception:
+            # La caché es una optimización: si falla, solo se pierde el atajo
+            logger.warning("No se pudo guardar %s en la caché", key, exc_info=True)
+    
+    @staticmethod
+    async def _obtener(key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await cache.get(key)
+        except Exception:
+            logger.warning("No se pudo leer %s de la caché", key, exc_info=True)
+            return None
+    
+    @staticmethod
+    async def get_validacion(hash_contenido: str, solo_invalidos: bool = False) -> Optional[Dict[str, Any]]:
+        return await UploadCacheService._obtener(UploadCacheService._clave_validacion(hash_contenido, solo_invalidos))
+    
+    @staticmethod
+    async def set_validacion(hash_contenido: str, validacion: Dict[str, Any], solo_invalidos: bool = False):
+        await UploadCacheService._guardar(UploadCacheService._clave_validacion(hash_contenido, solo_invalidos), validacion)
+    
+    @staticmethod
+    def _clave_validacion(hash_contenido: str, solo_invalidos: bool) -> str:
+        # Con y sin los registros válidos son respuestas distintas para el mismo archivo
+        return f"validacion:{'invalidos:' if solo_invalidos else ''}{hash_contenido}"
+    
+    @staticmethod
+    async def get_carga(hash_contenido: str, modo: ModoCarga) -> Optional[Dict[str, Any]]:
+        """Entrada {historial_id, task_id, respuesta}; respuesta es None mientras la carga sigue en curso"""
+        return await UploadCacheService._obtener(f"carga:{modo.value}:{hash_contenido}")
+    
+    @staticmethod
+    async def set_carga(
+        hash_contenido: str,
+        modo: ModoCarga,
+        historial_id: int,
+        task_id: str,
+        respuesta: Optional[Dict[str, Any]] = None
+    ):
+        await UploadCacheService._guardar(f"carga:{modo.value}:{hash_contenido}", {
+            "historial_id": historial_id,
+            "task_id": task_id,
+            "respuesta": respuesta
+        })
+    
+    @staticmethod
+    async def invalidar_carga(hash_contenido: str, modo: ModoCarga):
+        try:
+            await cache.delete(f"carga:{modo.value}:{hash_contenido}")
+        except Exception:
+            logger.warning("No se pudo invalidar la carga %s", hash_contenido, exc_info=True)
@@ -0,0 +1,113 @@
+import re
+import sys
+from email_validator import SPECIAL_USE_DOMAIN_NAMES
+from app.models.persona import TipoSangre
+from app.schemas.persona import PersonaBase, PersonaCreate
+from typing import Any, Dict, Type, TypeVar
+
+Modelo = TypeVar("Modelo", bound=PersonaBase)
+
+# Valor exacto -> miembro del enum, como lo convierte Pydantic
+TIPOS_SANGRE = {sys.intern(ts.value): ts for ts in TipoSangre}
+
+# Subconjunto de las direcciones que acepta email-validator (lo que usa EmailStr): parte
+# local dot-atom ASCII y dominio ASCII en minúsculas con TLD alfabético. Lo demás
+# (IDN, punycode, mayúsculas en el dominio, "Nombre <correo>") lo decide Pydantic.
+_ATEXT = r"A-Za-z0-9_!#$%&'*+\-/=?^`{|}~"
+PATRON_CORREO = re.compile(
+    rf"([{_ATEXT}]+(?:\.[{_ATEXT}]+)*)@((?:[a-z0-9](?:[a-z0-9-]{{0,61}}[a-z0-9])?\.)+[a-z]{{2,63}})"
+)
+CORREO_MAX = 254
+PARTE_LOCAL_MAX = 64
+TEXTO_MAX = 100
+EDAD_MIN, EDAD_MAX = 0, 150
+
+
+class FilaPersona:
+    """
+    Persona validada en el camino de carga (lector -> bulk_create). Con __slots__ no lleva
+    el diccionario por instancia de un modelo Pydantic ni la instrumentación de un objeto
+    ORM; los modelos solo se usan en los bordes de la API.
+    """
+    __slots__ = ("nombre", "apellido", "edad", "correo", "tipo_sangre")
+    
+    def __init__(self, nombre: str, apellido: str, edad: int, correo: str, tipo_sangre: TipoSangre):
+        self.nombre = nombre
+        self.apellido = apellido
+        self.edad = edad
+        self.correo = correo
+        self.tipo_sangre = tipo_sangre
+    
+    @classmethod
+    def desde_modelo(cls, persona: PersonaBase) -> "FilaPersona":
+        return cls(persona.nombre, persona.apellido, persona.edad, persona.correo, persona.tipo_sangre)
+    
+    def parametros(self) -> Dict[str, Any]:
+        """Columnas para el INSERT (igual que model_dump() del modelo)"""
+        return {
+            "nombre": self.nombre,
+            "apellido": self.apellido,
+            "edad": self.edad,
+            "correo": self.correo,
+            "tipo_sangre": self.tipo_sangre
+        }
+    
+    def valores_json(self) -> Dict[str, Any]:
+        """Valores aptos para JSON (igual que model_dump(mode="json") del modelo)"""
+        return {**self.parametros(), "tipo_sangre": self.tipo_sangre.value}
+    
+    def __repr__(self) -> str:
+        return f"FilaPersona({self.nombre!r}, {self.apellido!r}, {self.edad!r}, {self.correo!r}, {self.tipo_sangre.value!r})"
+
+
+def _correo_valido(correo: str) -> bool:
+    if len(correo) > CORREO_MAX:
+        return False
+    coincidencia = PATRON_CORREO.fullmatch(correo)
+    if coincidencia is None:
+        return False
+    local, dominio = coincidencia.groups()
+    if len(local) > PARTE_LOCAL_MAX or "--" in dominio:
+        return False
+    return not any(dominio == d or dominio.endswith("." + d) for d in SPECIAL_USE_DOMAIN_NAMES)
+
+
+def fila_valida(nombre, apellido, edad, correo, tipo_sangre) -> bool:
+    """
+    True solo si PersonaBase aceptaría la fila tal cual y con los mismos valores. False no
+    significa que la fila sea inválida: hay que validarla con Pydantic para decidirlo.
+    """
+    return (
+        type(nombre) is str and 1 <= len(nombre) <= TEXTO_MAX
+        and type(apellido) is str and 1 <= len(apellido) <= TEXTO_MAX
+        and type(edad) is int and EDAD_MIN <= edad <= EDAD_MAX
+        and type(tipo_sangre) is str and tipo_sangre in TIPOS_SANGRE
+        and type(correo) is str and _correo_valido(correo)
+    )
+
+
+def validar_persona(
+    nombre, apellido, edad, correo, tipo_sangre, modelo: Type[Modelo] = PersonaCreate
+) -> Modelo:
+    """
+    Construir `modelo` sin pasar por Pydantic (ni por email-validator) cuando fila_valida
+    lo asegura; si no, con la validación completa, que lanza ValidationError como siempre.
+    """
+    if fila_valida(nombre, apellido, edad, correo, tipo_sangre):
+        return modelo.model_construct(
+            nombre=nombre,
+            apellido=apellido,
+            edad=edad,
+            correo=correo,
+            tipo_sangre=TIPOS_SANGRE[tipo_sangre]
+        )
+    return modelo(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+
+
+def validar_fila(nombre, apellido, edad, correo, tipo_sangre) -> FilaPersona:
+    """Como validar_persona, pero devuelve una FilaPersona para la carga masiva"""
+    if fila_valida(nombre, apellido, edad, correo, tipo_sangre):
+        return FilaPersona(nombre, apellido, edad, correo, TIPOS_SANGRE[tipo_sangre])
+    return FilaPersona.desde_modelo(
+        PersonaCreate(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+    )
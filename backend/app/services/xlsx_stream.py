@@ -0,0 +1,319 @@
+import os
+import json
+import hashlib
+import tempfile
+import time
+from array import array
+from itertools import islice
+from collections import Counter
+import openpyxl
+from fastapi import UploadFile
+from pydantic import ValidationError
+from app.core.config import settings
+from app.core.metrics import medir_etapa, observar_etapa
+from app.services.validacion_rapida import FilaPersona, validar_fila
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+COLUMNAS_REQUERIDAS = ["nombre", "apellido", "edad", "correo", "tipo_sangre"]
+
+
+class ArchivoDemasiadoGrandeError(Exception):
+    """El archivo supera MAX_UPLOAD_SIZE"""
+
+
+async def guardar_upload(file: UploadFile, directorio: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Copiar el archivo subido a disco por bloques, sin cargarlo completo en memoria.
+    Devuelve la ruta y el SHA-256 del contenido, calculado en la misma pasada.
+    """
+    directorio = directorio or settings.UPLOAD_TEMP_DIR
+    os.makedirs(directorio, exist_ok=True)
+    sufijo = os.path.splitext(file.filename or "")[1]
+    fd, ruta = tempfile.mkstemp(suffix=sufijo, dir=os.path.abspath(directorio))
+
+    try:
+        escritos = 0
+        huella = hashlib.sha256()
+        with medir_etapa("lectura_archivo"), os.fdopen(fd, "wb") as destino:
+            while bloque := await file.read(settings.UPLOAD_SPOOL_CHUNK_SIZE):
+                escritos += len(bloque)
+                if escritos > settings.MAX_UPLOAD_SIZE:
+                    raise ArchivoDemasiadoGrandeError(
+                        f"El archivo supera el tamaño máximo de {settings.MAX_UPLOAD_SIZE} bytes"
+                    )
+                huella.update(bloque)
+                destino.write(bloque)
+    except BaseException:
+        os.remove(ruta)
+        raise
+
+    return ruta, huella.hexdigest()
+
+
+def _valor_celda(valor):
+    """Valor de una celda apto para JSON (las fechas y otros tipos se guardan como texto)"""
+    return valor if valor is None or isinstance(valor, (str, int, float, bool)) else str(valor)
+
+
+def describir_error(error: Exception) -> Tuple[str, str]:
+    """Tipo (para agrupar en el reporte) y mensaje de un error al convertir una fila"""
+    if isinstance(error, ValidationError):
+        detalles = [(".".join(map(str, d["loc"])), d) for d in error.errors()]
+        return (
+            ", ".join(f"{campo}: {d['type']}" for campo, d in detalles),
+            "; ".join(f"{campo}: {d['msg']}" for campo, d in detalles)
+        )
+    if isinstance(error, IndexError):
+        return "fila_incompleta", "La fila no tiene todas las columnas requeridas"
+    # Fuera de pydantic, el resto de los errores viene de convertir la edad a entero
+    return "edad: int_parsing", f"edad: no es un número entero ({error})"
+
+
+def texto_error(error) -> str:
+    """Error de fila como texto; acepta también los del formato anterior (ya eran texto)"""
+    return f"Fila {error['fila']}: {error['mensaje']}" if isinstance(error, dict) else str(error)
+
+
+def ruta_marca_division(ruta: str) -> str:
+    """Archivo que indica que las partes de `ruta` se escribieron completas"""
+    return f"{ruta}.partes"
+
+
+class _LectorPersonas:
+    """
+    Conversión perezosa de filas crudas a FilaPersona, acumulando los errores por fila
+    con los valores originales (para el reporte de filas rechazadas).
+
+    Como la lectura y la validación se intercalan con la inserción, sus tiempos se acumulan
+    por fila y se registran como etapas parseo_libro y validacion al agotar el generador.
+    """
+
+    def __init__(self):
+        self.errores: List[Dict] = []
+        self.errores_por_tipo: Counter = Counter()
+        self.total_validos = 0
+        self.filas_leidas = 0
+        # Número de fila de cada persona válida, compacto aunque el archivo sea enorme
+        self.filas_validas = array("l")
+        self.tiempo_parseo = 0.0
+
+    def _convertir(self, filas: Iterable[Tuple[int, Sequence]], indices: Dict[str, int]) -> Iterator[FilaPersona]:
+        filas = iter(filas)
+        tiempo_validacion = 0.0
+        leidas = 0
+        while True:
+            inicio = time.perf_counter()
+            siguiente = next(filas, None)
+            leida = time.perf_counter()
+            self.tiempo_parseo += leida - inicio
+            if siguiente is None:
+                break
+
+            i, row = siguiente
+            self.filas_leidas += 1
+            leidas += 1
+            if all(cell is None for cell in row):
+                continue  # Fila vacía
+
+            try:
+                persona = validar_fila(
+                    str(row[indices['nombre']]).strip(),
+                    str(row[indices['apellido']]).strip(),
+                    int(row[indices['edad']]),
+                    str(row[indices['correo']]).strip().lower(),
+                    str(row[indices['tipo_sangre']]).strip().upper()
+                )
+            except Exception as e:
+                tipo, mensaje = describir_error(e)
+                self.errores_por_tipo[tipo] += 1
+                self.errores.append({
+                    "fila": i,
+                    "tipo": tipo,
+                    "mensaje": mensaje,
+                    "valores": {
+                        col: _valor_celda(row[pos]) if pos < len(row) else None
+                        for col, pos in indices.items()
+                    }
+                })
+                continue
+            finally:
+                tiempo_validacion += time.perf_counter() - leida
+
+            self.total_validos += 1
+            self.filas_validas.append(i)
+            yield persona
+
+        observar_etapa("parseo_libro", self.tiempo_parseo, leidas)
+        observar_etapa("validacion", tiempo_validacion, leidas)
+
+    def con_fila(self, duplicados: List[Dict]) -> List[Dict]:
+        """Agregar a cada duplicado de bulk_create su número de fila en el archivo"""
+        return [{**duplicado, "fila": self.filas_validas[duplicado["indice"]]} for duplicado in duplicados]
+
+
+class LectorPersonasXLSX(_LectorPersonas):
+    """Lee un XLSX en modo read-only y entrega las filas como FilaPersona de forma perezosa"""
+
+    def __init__(self, file_path: str):
+        super().__init__()
+        self.file_path = file_path
+        inicio = time.perf_counter()
+        self.workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        self.sheet = self.workbook.active
+
+        # La etiqueta <dimension> la escribe quien genera el archivo y puede mentir (p. ej.
+        # "A1"): solo se usa como estimación del total; la lectura llega a la última fila y columna
+        self._max_row_declarado = self.sheet.max_row
+        self.sheet.reset_dimensions()
+
+        primera_fila = next(self.sheet.iter_rows(max_row=1, values_only=True), ())
+        self.tiempo_parseo = time.perf_counter() - inicio
+        self.headers = [str(h).lower().strip() if h else '' for h in primera_fila]
+        self.columnas_faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in self.headers]
+        self.indices = {
+            col: self.headers.index(col)
+            for col in COLUMNAS_REQUERIDAS if col not in self.columnas_faltantes
+        }
+
+    @property
+    def total_filas(self) -> int:
+        """Filas de datos según las dimensiones declaradas de la hoja (sin contar el encabezado)"""
+        if self._max_row_declarado is None:
+            self.sheet.calculate_dimension(force=True)
+            self._max_row_declarado = self.sheet.max_row
+        return max((self._max_row_declarado or 1) - 1, 0)
+
+    def _filas(self, desde: int = 0) -> Iterator[Tuple[int, Sequence]]:
+        return enumerate(self.sheet.iter_rows(min_row=2 + desde, values_only=True), start=2 + desde)
+
+    def personas(self, desde: int = 0) -> Iterator[FilaPersona]:
+        """
+        Generador de personas válidas; los errores por fila se acumulan en self.errores.
+        `desde` omite las primeras filas de datos (ya confirmadas por un checkpoint).
+        """
+        self.filas_leidas = desde
+        return self._convertir(self._filas(desde), self.indices)
+
+    def dividir(self, filas_por_parte: int) -> List[str]:
+        """
+        Reparte las filas en archivos JSON Lines de hasta `filas_por_parte` filas, en una sola
+        pasada, para que cada parte se procese por separado sin volver a leer el XLSX.
+        Solo se guardan las columnas requeridas junto con el número de fila original.
+
+        Las partes se escriben con nombre temporal y se renombran al terminar la pasada; la
+        marca `ruta_marca_division` se crea al final, así unas partes sin marca (un corte a
+        mitad de la división) se descartan y el archivo se vuelve a dividir.
+        """
+        partes = []
+        destino = None
+        posiciones = [self.indices[col] for col in COLUMNAS_REQUERIDAS]
+
+        try:
+            for n, (i, row) in enumerate(self._filas()):
+                if n % filas_por_parte == 0:
+                    if destino:
+                        destino.close()
+                    partes.append(f"{self.file_path}.parte{len(partes)}.jsonl")
+                    destino = open(partes[-1] + ".tmp", "w", encoding="utf-8")
+                valores = [row[pos] if pos < len(row) else None for pos in posiciones]
+                destino.write(json.dumps([i, valores], default=str) + "\n")
+        finally:
+            if destino:
+                destino.close()
+
+        for parte in partes:
+            os.replace(parte + ".tmp", parte)
+        with open(ruta_marca_division(self.file_path), "w", encoding="utf-8") as marca:
+            marca.write(str(len(partes)))
+
+        return partes
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LecturaXLSX(_LectorPersonas):
+    """
+    Resultado de leer_personas_xlsx: encabezados, cantidad de filas y, si el archivo entra
+    en `max_filas` (`leida`), todas sus personas válidas con los errores por fila ya calculados.
+    Expone la misma interfaz que LectorPersonasXLSX para insertar las personas por bloques.
+    """
+
+    def __init__(self, lector: LectorPersonasXLSX):
+        super().__init__()
+        self.headers = lector.headers
+        self.columnas_faltantes = lector.columnas_faltantes
+        self.total_filas = lector.total_filas
+        self.leida = False
+        self.validas: List[FilaPersona] = []
+        self._filas_leidas_total = 0
+
+    def leer(self, lector: LectorPersonasXLSX, max_filas: int):
+        # Las dimensiones de la hoja las escribe quien genera el archivo y pueden mentir
+        # (p. ej. "A1"): se cuentan las filas reales, sin leer más de max_filas + 1
+        inicio = time.perf_counter()
+        filas = list(islice(lector._filas(), max_filas + 1))
+        lector.tiempo_parseo += time.perf_counter() - inicio
+        if len(filas) > max_filas:
+            self.total_filas = max(self.total_filas, len(filas))
+            return
+
+        self.total_filas = len(filas)
+        self.validas = list(lector._convertir(filas, lector.indices))
+        self.errores = lector.errores
+        self.errores_por_tipo = lector.errores_por_tipo
+        self.total_validos = lector.total_validos
+        self.filas_validas = lector.filas_validas
+        self._filas_leidas_total = lector.filas_leidas
+        self.leida = True
+
+    def personas(self) -> Iterator[FilaPersona]:
+        # filas_leidas avanza con cada persona entregada, como en la lectura perezosa
+        for fila, persona in zip(self.filas_validas, self.validas):
+            self.filas_leidas = fila - 1
+            yield persona
+        self.filas_leidas = self._filas_leidas_total
+
+
+def leer_personas_xlsx(ruta: str, max_filas: int) -> LecturaXLSX:
+    """
+    Pensada para el pool de procesos (app.core.procesos): abre el XLSX y, si tiene todas las
+    columnas y no supera `max_filas`, lee y valida todas sus filas de una vez. Si tiene más,
+    `leida` queda en False y el archivo va a la carga asíncrona sin validarse aquí.
+    """
+    with LectorPersonasXLSX(ruta) as lector:
+        lectura = LecturaXLSX(lector)
+        if not lector.columnas_faltantes:
+            lectura.leer(lector, max_filas)
+        return lectura
+
+
+class LectorParteJSONL(_LectorPersonas):
+    """Lee una parte generada por LectorPersonasXLSX.dividir"""
+
+    INDICES = {col: pos for pos, col in enumerate(COLUMNAS_REQUERIDAS)}
+
+    def __init__(self, ruta_parte: str):
+        super().__init__()
+        self.ruta_parte = ruta_parte
+
+    @property
+    def origen(self) -> str:
+        """Nombre de la parte para los checkpoints ("parte0", "parte1", ...)"""
+        return os.path.basename(self.ruta_parte).rsplit(".", 2)[-2]
+
+    def _filas(self, desde: int = 0) -> Iterator[Tuple[int, Sequence]]:
+        with open(self.ruta_parte, encoding="utf-8") as origen:
+            for linea in islice(origen, desde, None):
+                i, valores = json.loads(linea)
+                yield i, valores
+
+    def personas(self, desde: int = 0) -> Iterator[FilaPersona]:
+        self.filas_leidas = desde
+        return self._convertir(self._filas(desde), self.INDICES)
@@ -0,0 +1,388 @@
+import asyncio
+import glob
+import os
+import re
+import time
+from collections import Counter
+from celery import chord
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import create_task_sessionmaker
+from app.core.pubsub import create_pubsub_backend
+from app.core.websocket_manager import ConnectionManager
+from app.schemas.historial import HistorialCargaUpdate, TipoDetalle
+from app.schemas.persona import ModoCarga
+from app.services.historial_service import HistorialService
+from app.services.persona_service import PersonaService, ResultadoCarga, DuplicadosError
+from app.services.xlsx_stream import LectorPersonasXLSX, LectorParteJSONL, ruta_marca_division
+
+# Origen del checkpoint cuando el archivo se procesa en una sola tarea
+ORIGEN_ARCHIVO = "archivo"
+# Sufijos de los archivos derivados de un upload: partes (y sus temporales) y marca de división
+# Estados de las cargas que todavía van a leer su archivo (ver limpiar_uploads)
+ESTADOS_ACTIVOS = ("pending", "processing")
+SUFIJOS_CARGA = re.compile(r"(\.parte\d+\.jsonl(\.tmp)?|\.partes)$")
+
+
+def _crear_notificador() -> ConnectionManager:
+    """Notificador propio de la tarea: publica en el backend pub/sub que reenvía la API"""
+    return ConnectionManager(backend=create_pubsub_backend())
+
+
+def partes_pendientes(ruta: str) -> list:
+    """
+    Partes de una carga paralela que todavía no terminaron (las completas se borran).
+    Sin la marca de división completa no hay partes confiables: el XLSX se divide de nuevo.
+    """
+    if not os.path.exists(ruta_marca_division(ruta)):
+        return []
+    return sorted(glob.glob(f"{glob.escape(ruta)}.parte*.jsonl"))
+
+
+def borrar_archivos_carga(ruta: str):
+    """Borrar el XLSX de una carga junto con sus partes, temporales y marca de división"""
+    for archivo in [ruta, ruta_marca_division(ruta), *glob.glob(f"{glob.escape(ruta)}.parte*")]:
+        try:
+            os.remove(archivo)
+        except FileNotFoundError:
+            pass  # No existía o lo borró otra tarea entretanto
+
+
+def _checkpoint(historial, origen: str) -> int:
+    return (historial.checkpoints or {}).get(origen, 0)
+
+
+def _confirmar_bloque(db, historial_id: int, origen: str, lector):
+    """
+    Callback `al_confirmar` de bulk_create: guarda la posición del lector, los contadores
+    y los duplicados y errores del bloque en la misma transacción que sus filas.
+    """
+    errores_previos = len(lector.errores)
+
+    async def al_confirmar(parcial: ResultadoCarga):
+        nonlocal errores_previos
+        errores = lector.errores[errores_previos:]
+        await HistorialService.registrar_checkpoint(
+            db,
+            historial_id,
+            origen,
+            lector.filas_leidas,
+            registros_exitosos=len(parcial.ids_creados),
+            registros_duplicados=len(parcial.duplicados),
+            registros_error=len(errores)
+        )
+        await HistorialService.agregar_detalles(
+            db, historial_id, TipoDetalle.DUPLICADOS, lector.con_fila(parcial.duplicados)
+        )
+        await HistorialService.agregar_detalles(db, historial_id, TipoDetalle.ERRORES, errores)
+        # Ya quedan en el historial: en memoria solo se conservan las primeras como muestra
+        del lector.errores[settings.UPLOAD_REPORT_SAMPLES:]
+        errores_previos = len(lector.errores)
+
+    return al_confirmar
+
+
+async def _procesar_archivo(task, ruta: str, historial_id: int, modo: ModoCarga) -> dict:
+    engine, SessionLocal = create_task_sessionmaker()
+    notificador = _crear_notificador()
+    task_id = task.request.id
+    nombre_archivo = None
+
+    try:
+        async with SessionLocal() as db:
+            with LectorPersonasXLSX(ruta) as lector:
+                total = lector.total_filas
+                await HistorialService.update(
+                    db, historial_id, HistorialCargaUpdate(estado="processing", total_registros=total)
+                )
+                historial = await HistorialService.get_by_id(db, historial_id)
+                nombre_archivo = historial.nombre_archivo
+                desde = _checkpoint(historial, ORIGEN_ARCHIVO)
+                await notificador.notify_upload_start(nombre_archivo, total, task_id=task_id)
+
+                async def reportar(parcial: ResultadoCarga):
+                    progreso = min(int(lector.filas_leidas * 100 / total), 99) if total else 0
+                    task.update_state(state="PROGRESS", meta={
+                        "progreso": progreso,
+                        "procesados": lector.filas_leidas,
+                        "total": total,
+                        "exitosos": len(parcial.ids_creados),
+                        "duplicados": parcial.total_duplicados,
+                    })
+                    await notificador.notify_upload_progress(task_id, progreso, lector.filas_leidas, total)
+
+                # Al reanudar, las filas ya confirmadas no se vuelven a validar ni insertar
+                al_confirmar = _confirmar_bloque(db, historial_id, ORIGEN_ARCHIVO, lector)
+                try:
+                    carga = await PersonaService.bulk_create(
+                        db,
+                        lector.personas(desde),
+                        modo=modo,
+                        progreso=reportar,
+                        al_confirmar=al_confirmar,
+                        max_duplicados=settings.UPLOAD_REPORT_SAMPLES
+                    )
+                except DuplicadosError as e:
+                    await HistorialService.marcar_fallido(
+                        db,
+                        historial_id,
+                        detalles_errores=[str(e)] + lector.errores,
+                        detalles_duplicados=lector.con_fila(e.duplicados)
+                    )
+                    await notificador.notify_upload_error(nombre_archivo, str(e), task_id=task_id)
+                    raise
+
+                # En modo fail no hay checkpoints intermedios y se registra la carga completa;
+                # en los demás solo quedan las filas inválidas leídas tras el último bloque
+                await al_confirmar(carga if modo == ModoCarga.FAIL else ResultadoCarga())
+
+            await HistorialService.marcar_completado(db, historial_id)
+            historial = await HistorialService.get_by_id(db, historial_id)
+            await notificador.notify_upload_complete(
+                nombre_archivo,
+                exitosos=historial.registros_exitosos,
+                duplicados=historial.registros_duplicados,
+                errores=historial.registros_error,
+                detalles_duplicados=carga.duplicados,
+                task_id=task_id
+            )
+
+            return {
+                "total_procesados": lector.total_validos,
+                "registros_exitosos": historial.registros_exitosos,
+                "registros_actualizados": carga.actualizados,
+                "registros_sin_cambios": carga.sin_cambios,
+                "registros_duplicados": historial.registros_duplicados,
+                "registros_error": historial.registros_error,
+                "errores_por_tipo": dict(lector.errores_por_tipo),
+            }
+    except DuplicadosError:
+        raise
+    except Exception as e:
+        async with SessionLocal() as db:
+            await HistorialService.marcar_fallido(db, historial_id, detalles_errores=[str(e)])
+        await notificador.notify_upload_error(nombre_archivo, str(e), task_id=task_id)
+        raise
+    finally:
+        await notificador.backend.close()
+        await engine.dispose()
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    name="app.tasks.carga_tasks.procesar_archivo"
+)
+def procesar_archivo(self, ruta: str, historial_id: int, modo: str = ModoCarga.SKIP.value) -> dict:
+    """
+    Valida e inserta por bloques un archivo XLSX ya copiado a disco.
+
+    Por encima de PARALLEL_THRESHOLD filas el archivo se reparte en partes que procesan
+    varios workers en paralelo; el chord resultante hereda el task_id de esta tarea. No se
+    reparte en modo fail, que exige una sola transacción, ni en upsert: con un correo
+    repetido en dos partes, la fila que queda dependería del orden de los workers.
+
+    Cada bloque confirmado deja un checkpoint en el historial. Si el worker muere, el
+    mensaje se vuelve a entregar (acks_late) y la carga sigue desde el último bloque; lo
+    mismo al reanudarla desde la API. Por eso los archivos solo se borran al terminar, y el
+    XLSX se conserva hasta que la división deja su marca de partes completas.
+    """
+    partes = partes_pendientes(ruta)
+    if not partes and os.path.exists(ruta_marca_division(ruta)):
+        # Todas las partes se confirmaron y solo faltó consolidar la carga
+        return consolidar_carga([], historial_id)
+
+    terminado = False
+    try:
+        if not partes and not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe el archivo a procesar: {ruta}")
+
+        if not partes:
+            # Restos de una división interrumpida: el XLSX se conservó y se divide de nuevo
+            for restante in glob.glob(f"{glob.escape(ruta)}.parte*") + [ruta_marca_division(ruta)]:
+                if os.path.exists(restante):
+                    os.remove(restante)
+
+        if not partes and ModoCarga(modo) not in (ModoCarga.FAIL, ModoCarga.UPSERT):
+            with LectorPersonasXLSX(ruta) as lector:
+                if lector.total_filas > settings.PARALLEL_THRESHOLD:
+                    partes = lector.dividir(settings.PARALLEL_CHUNK_ROWS)
+
+        if not partes:
+            resultado = asyncio.run(_procesar_archivo(self, ruta, historial_id, ModoCarga(modo)))
+            terminado = True
+            return resultado
+
+        # Las partes ya contienen todas las filas del archivo original
+        terminado = True
+    except DuplicadosError:
+        terminado = True
+        raise
+    finally:
+        if terminado and os.path.exists(ruta):
+            os.remove(ruta)
+
+    return self.replace(chord(
+        [procesar_parte.s(parte, historial_id, modo, self.request.id) for parte in partes],
+        consolidar_carga.s(historial_id).on_error(marcar_carga_fallida.s(historial_id))
+    ))
+
+
+async def _procesar_parte(task, ruta_parte: str, historial_id: int, modo: ModoCarga, task_id_padre: str) -> dict:
+    engine, SessionLocal = create_task_sessionmaker()
+    notificador = _crear_notificador()
+    lector = LectorParteJSONL(ruta_parte)
+
+    try:
+        async with SessionLocal() as db:
+            await HistorialService.update(db, historial_id, HistorialCargaUpdate(estado="processing"))
+            desde = _checkpoint(await HistorialService.get_by_id(db, historial_id), lector.origen)
+
+            # Los duplicados entre partes los resuelve el índice único de correo
+            al_confirmar = _confirmar_bloque(db, historial_id, lector.origen, lector)
+            carga = await PersonaService.bulk_create(
+                db, lector.personas(desde), modo=modo, al_confirmar=al_confirmar,
+                max_duplicados=settings.UPLOAD_REPORT_SAMPLES
+            )
+            await al_confirmar(ResultadoCarga())
+            await db.commit()
+            historial = await HistorialService.get_by_id(db, historial_id)
+
+        procesados = historial.registros_exitosos + historial.registros_duplicados + historial.registros_error
+        progreso = min(int(procesados * 100 / historial.total_registros), 99) if historial.total_registros else 0
+        task.backend.store_result(task_id_padre, {
+            "progreso": progreso,
+            "procesados": procesados,
+            "total": historial.total_registros,
+            "exitosos": historial.registros_exitosos,
+            "duplicados": historial.registros_duplicados,
+        }, "PROGRESS")
+        await notificador.notify_upload_progress(task_id_padre, progreso, procesados, historial.total_registros)
+
+        return {
+            "total_procesados": lector.total_validos,
+            "registros_exitosos": len(carga.ids_creados),
+            "registros_actualizados": carga.actualizados,
+            "registros_sin_cambios": carga.sin_cambios,
+            "errores_por_tipo": dict(lector.errores_por_tipo),
+        }
+    finally:
+        await notificador.backend.close()
+        await engine.dispose()
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    name="app.tasks.carga_tasks.procesar_parte"
+)
+def procesar_parte(self, ruta_parte: str, historial_id: int, modo: str, task_id_padre: str) -> dict:
+    """Valida e inserta un rango de filas generado por LectorPersonasXLSX.dividir"""
+    resultado = asyncio.run(_procesar_parte(self, ruta_parte, historial_id, ModoCarga(modo), task_id_padre))
+    # Una parte que falla se conserva para poder reanudar la carga
+    os.remove(ruta_parte)
+    return resultado
+
+
+async def _consolidar_carga(resultados: list, historial_id: int) -> dict:
+    engine, SessionLocal = create_task_sessionmaker()
+    notificador = _crear_notificador()
+    errores_por_tipo = Counter()
+    for resultado in resultados:
+        errores_por_tipo.update(resultado.get("errores_por_tipo", {}))
+    try:
+        async with SessionLocal() as db:
+            # Contadores y detalles ya los guardaron los checkpoints de cada parte
+            await HistorialService.marcar_completado(db, historial_id)
+            historial = await HistorialService.get_by_id(db, historial_id)
+            if historial.ruta_archivo:
+                borrar_archivos_carga(historial.ruta_archivo)
+            # Al WebSocket solo va la primera página; el resto se consulta en el historial
+            duplicados, _ = await HistorialService.get_detalles(db, historial_id, TipoDetalle.DUPLICADOS)
+        await notificador.notify_upload_complete(
+            historial.nombre_archivo,
+            exitosos=historial.registros_exitosos,
+            duplicados=historial.registros_duplicados,
+            errores=historial.registros_error,
+            detalles_duplicados=duplicados,
+            task_id=historial.task_id
+        )
+    finally:
+        await notificador.backend.close()
+        await engine.dispose()
+
+    return {
+        "total_procesados": sum(r["total_procesados"] for r in resultados),
+        "registros_exitosos": historial.registros_exitosos,
+        "registros_actualizados": sum(r["registros_actualizados"] for r in resultados),
+        "registros_sin_cambios": sum(r["registros_sin_cambios"] for r in resultados),
+        "registros_duplicados": historial.registros_duplicados,
+        "registros_error": historial.registros_error,
+        "errores_por_tipo": dict(errores_por_tipo),
+    }
+
+
+@celery_app.task(name="app.tasks.carga_tasks.consolidar_carga")
+def consolidar_carga(resultados: list, historial_id: int) -> dict:
+    """Unifica los resultados de todas las partes en un único HistorialCarga"""
+    return asyncio.run(_consolidar_carga(resultados, historial_id))
+
+
+async def _marcar_carga_fallida(historial_id: int, error: str):
+    engine, SessionLocal = create_task_sessionmaker()
+    notificador = _crear_notificador()
+    try:
+        async with SessionLocal() as db:
+            await HistorialService.marcar_fallido(db, historial_id, detalles_errores=[error])
+            historial = await HistorialService.get_by_id(db, historial_id)
+        await notificador.notify_upload_error(historial.nombre_archivo, error, task_id=historial.task_id)
+    finally:
+        await notificador.backend.close()
+        await engine.dispose()
+
+
+@celery_app.task(name="app.tasks.carga_tasks.marcar_carga_fallida")
+def marcar_carga_fallida(request, exc, traceback, historial_id: int):
+    """Errback del chord: alguna parte falló"""
+    asyncio.run(_marcar_carga_fallida(historial_id, str(exc)))
+
+
+async def _limpiar_uploads() -> int:
+    engine, SessionLocal = create_task_sessionmaker()
+    directorio = os.path.abspath(settings.UPLOAD_TEMP_DIR)
+    limite = time.time() - settings.UPLOAD_TEMP_TTL
+
+    # Cada upload se agrupa con sus partes; cuenta la modificación más reciente del grupo
+    modificados = {}
+    for nombre in os.listdir(directorio) if os.path.isdir(directorio) else []:
+        ruta = os.path.join(directorio, SUFIJOS_CARGA.sub("", nombre))
+        try:
+            modificado = os.path.getmtime(os.path.join(directorio, nombre))
+        except OSError:
+            continue  # Otra tarea o la API lo borró después del listado
+        modificados[ruta] = max(modificados.get(ruta, 0), modificado)
+    vencidos = [ruta for ruta, modificado in modificados.items() if modificado < limite]
+
+    try:
+        async with SessionLocal() as db:
+            estados = await HistorialService.get_estados_por_ruta(db, vencidos)
+    finally:
+        await engine.dispose()
+
+    # Las cargas en cola o en curso conservan sus archivos; el resto ya no se va a reanudar
+    borrados = [ruta for ruta in vencidos if estados.get(ruta) not in ESTADOS_ACTIVOS]
+    for ruta in borrados:
+        borrar_archivos_carga(ruta)
+    return len(borrados)
+
+
+@celery_app.task(name="app.tasks.carga_tasks.limpiar_uploads")
+def limpiar_uploads() -> int:
+    """
+    Tarea periódica (celery beat): borra los uploads sin cambios en UPLOAD_TEMP_TTL segundos
+    que no pertenecen a una carga en cola o en curso, como los de cargas fallidas que nunca
+    se reanudaron, o copias huérfanas de un proceso de la API que se cortó.
+    """
+    return asyncio.run(_limpiar_uploads())
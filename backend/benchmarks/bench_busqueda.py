@@ -0,0 +1,117 @@
+"""
+Benchmark de latencia de PersonaService.search sobre una tabla poblada.
+
+Siembra --filas personas (1M por defecto) y mide p50/p95/p99 de cada tipo de
+búsqueda: texto completo en nombre/apellido, prefijo de correo, prefijo de
+dominio y filtros de tipo de sangre y edad. Como referencia incluye el
+LIKE '%x%' ingenuo, que recorre la tabla completa.
+
+Requiere MySQL (el índice FULLTEXT no existe en otros motores) con las
+migraciones aplicadas.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_busqueda --filas 1000000 --repeticiones 50
+    python -m benchmarks.bench_busqueda --sin-sembrar   # reutilizar los datos de una corrida anterior
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, insert, select, or_
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.database import ASYNC_DATABASE_URL
+from app.models.persona import Persona, TipoSangre
+from app.services.persona_service import PersonaService
+
+DOMINIO = "benchmark.example.com"
+NOMBRES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Felipe", "Gabriela", "Hugo", "Isabel", "Javier"]
+APELLIDOS = ["Pérez", "González", "Rodríguez", "Fernández", "López", "Martínez", "Sánchez", "Romero"]
+
+
+async def sembrar(session_factory, filas: int):
+    tipos = list(TipoSangre)
+    async with session_factory() as db:
+        for inicio in range(0, filas, 5000):
+            await db.execute(insert(Persona), [
+                {
+                    "nombre": f"{NOMBRES[i % len(NOMBRES)]}{i % 997}",
+                    "apellido": APELLIDOS[(i // 7) % len(APELLIDOS)],
+                    "edad": i % 100,
+                    "correo": f"persona{i}@d{i % 200}.{DOMINIO}",
+                    "tipo_sangre": tipos[i % len(tipos)]
+                }
+                for i in range(inicio, min(inicio + 5000, filas))
+            ])
+            await db.commit()
+
+
+async def limpiar(session_factory):
+    async with session_factory() as db:
+        await db.execute(delete(Persona).where(Persona.correo.like(f"%.{DOMINIO}")))
+        await db.commit()
+
+
+async def like_ingenuo(db, texto: str, limit: int):
+    patron = f"%{texto}%"
+    result = await db.execute(
+        select(Persona.id)
+        .where(or_(Persona.nombre.like(patron), Persona.apellido.like(patron), Persona.correo.like(patron)))
+        .order_by(Persona.created_at.desc(), Persona.id.desc())
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def medir(session_factory, consulta, repeticiones: int):
+    tiempos = []
+    async with session_factory() as db:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            await consulta(db)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    percentil = lambda p: tiempos[min(int(len(tiempos) * p), len(tiempos) - 1)]
+    return statistics.median(tiempos), percentil(0.95), percentil(0.99)
+
+
+async def main(args):
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    if not args.sin_sembrar:
+        await limpiar(session_factory)
+        await sembrar(session_factory, args.filas)
+
+    consultas = {
+        "texto completo": lambda db: PersonaService.search(db, q="Gabri", limit=args.limit),
+        "nombre y apellido": lambda db: PersonaService.search(db, q="Elena López", limit=args.limit),
+        "prefijo correo": lambda db: PersonaService.search(db, correo="persona1234", limit=args.limit),
+        "prefijo dominio": lambda db: PersonaService.search(db, dominio="d42.", limit=args.limit),
+        "sangre + edad": lambda db: PersonaService.search(
+            db, tipo_sangre=TipoSangre.AB_NEGATIVO, edad_min=30, edad_max=35, limit=args.limit
+        ),
+        "LIKE '%x%'": lambda db: like_ingenuo(db, "Gabri", args.limit),
+    }
+
+    try:
+        print(f"{'consulta':<18} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9}")
+        for nombre, consulta in consultas.items():
+            p50, p95, p99 = await medir(session_factory, consulta, args.repeticiones)
+            print(f"{nombre:<18} | {p50:>9.2f} | {p95:>9.2f} | {p99:>9.2f}")
+    finally:
+        if not args.conservar:
+            await limpiar(session_factory)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=ASYNC_DATABASE_URL)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--sin-sembrar", action="store_true", help="No sembrar; usar los datos existentes")
+    parser.add_argument("--conservar", action="store_true", help="No borrar los datos sembrados al terminar")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Benchmark de detección de duplicados en la carga masiva de personas.
+
+Compara la ruta anterior (un SELECT por fila) contra la detección por bloques
+de PersonaService.bulk_create, midiendo cómo crece el tiempo de ingesta con
+el número de filas. La mitad de cada lote ya existe en la base de datos.
+Requiere MySQL: bulk_create actualiza el resumen de estadísticas con
+INSERT ... ON DUPLICATE KEY UPDATE.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_duplicados --filas 1000 5000 20000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.database import Base, ASYNC_DATABASE_URL
+from app.models.persona import Persona
+from app.schemas.persona import PersonaCreate
+from app.services.persona_service import PersonaService
+from app.services.validacion_rapida import FilaPersona
+
+DOMINIO = "benchmark.example.com"
+
+
+async def bulk_create_anterior(db: AsyncSession, personas_data):
+    """Ruta anterior: una consulta get_by_email por fila"""
+    personas_creadas = []
+    duplicados = []
+    for idx, persona_data in enumerate(personas_data):
+        existing = await PersonaService.get_by_email(db, persona_data.correo)
+        if existing:
+            duplicados.append({"indice": idx, "correo": persona_data.correo})
+        else:
+            persona = Persona(**persona_data.model_dump())
+            db.add(persona)
+            personas_creadas.append(persona)
+    if personas_creadas:
+        await db.commit()
+        for persona in personas_creadas:
+            await db.refresh(persona)
+    return personas_creadas, duplicados
+
+
+def generar_personas(prefijo: str, inicio: int, cantidad: int):
+    return [
+        PersonaCreate(
+            nombre=f"Nombre{i}",
+            apellido=f"Apellido{i}",
+            edad=i % 100,
+            correo=f"{prefijo}-{i}@{DOMINIO}",
+            tipo_sangre="O+"
+        )
+        for i in range(inicio, inicio + cantidad)
+    ]
+
+
+async def limpiar(session_factory):
+    async with session_factory() as db:
+        await db.execute(delete(Persona).where(Persona.correo.like(f"%@{DOMINIO}")))
+        await db.commit()
+
+
+async def medir(session_factory, funcion, prefijo: str, filas: int, convertir=None) -> float:
+    # La mitad del lote se precarga para que aparezca como duplicado
+    async with session_factory() as db:
+        db.add_all(Persona(**p.model_dump()) for p in generar_personas(prefijo, 0, filas // 2))
+        await db.commit()
+
+    personas = generar_personas(prefijo, 0, filas)
+    if convertir:
+        # Fuera de la medición: cada ruta recibe las filas como las produce su lector
+        personas = [convertir(persona) for persona in personas]
+    async with session_factory() as db:
+        inicio = time.perf_counter()
+        resultado = await funcion(db, personas)
+        transcurrido = time.perf_counter() - inicio
+
+    duplicados = resultado[1] if isinstance(resultado, tuple) else resultado.duplicados
+    assert len(duplicados) == filas // 2
+    await limpiar(session_factory)
+    return transcurrido
+
+
+async def main(database_url: str, filas_por_corrida):
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await limpiar(session_factory)
+
+    print(f"{'filas':>8} | {'anterior (s)':>12} | {'por bloques (s)':>15} | {'mejora':>7}")
+    for filas in filas_por_corrida:
+        anterior = await medir(session_factory, bulk_create_anterior, "old", filas)
+        nuevo = await medir(session_factory, PersonaService.bulk_create, "new", filas, FilaPersona.desde_modelo)
+        print(f"{filas:>8} | {anterior:>12.3f} | {nuevo:>15.3f} | {anterior / nuevo:>6.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=ASYNC_DATABASE_URL)
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.filas))
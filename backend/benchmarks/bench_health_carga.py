@@ -0,0 +1,157 @@
+"""
+Prueba de carga: latencia de /health mientras se validan archivos XLSX grandes.
+
+Compara tres formas de ejecutar la lectura y validación de /api/upload/validate:
+  - loop:     directamente en el event loop (como hacía validate-and-process)
+  - hilos:    run_in_threadpool (como hacía /validate; el GIL sigue compartido)
+  - procesos: el pool de procesos actual (PARSE_POOL_WORKERS / PARSE_POOL_MAX_QUEUE)
+
+Levanta uvicorn en un hilo; varios clientes suben archivos sin parar mientras otro
+consulta /health y registra la latencia de cada petición. La caché de validaciones se
+desactiva para que cada subida se lea de nuevo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_health_carga --filas 20000 --subidas 4 --segundos 15
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+import requests
+import uvicorn
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from app.core.procesos import PoolProcesos
+from app.routers import upload
+from app.services.upload_cache import UploadCacheService
+from app.services.xlsx_validator import XLSXValidator
+
+
+class EjecucionEnLoop:
+    async def ejecutar(self, funcion, *args):
+        return funcion(*args)
+
+
+class EjecucionEnHilos:
+    async def ejecutar(self, funcion, *args):
+        return await run_in_threadpool(funcion, *args)
+
+
+async def sin_cache(hash_contenido, solo_invalidos=False):
+    return None
+
+
+def crear_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api")
+
+    @app.get("/health")
+    async def health_check():
+        return {"estado": "healthy"}
+
+    return app
+
+
+def generar_archivo(ruta: str, filas: int):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Nombre", "Apellido", "Edad", "Correo", "Tipo Sangre"])
+    tipos = XLSXValidator.TIPOS_SANGRE_VALIDOS
+    for i in range(filas):
+        sheet.append([f"Nombre{i}", f"Apellido{i}", i % 100, f"carga{i}@example.com", tipos[i % len(tipos)]])
+    workbook.save(ruta)
+
+
+def percentil(valores, p: int) -> float:
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1] if len(valores) > 1 else valores[0]
+
+
+def medir(base: str, contenido: bytes, segundos: float, subidas: int) -> dict:
+    fin = time.perf_counter() + segundos
+    latencias = []
+    estados = {}
+
+    def health():
+        sesion = requests.Session()
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            sesion.get(f"{base}/health").raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+            time.sleep(0.01)
+
+    def subir():
+        sesion = requests.Session()
+        while time.perf_counter() < fin:
+            respuesta = sesion.post(
+                f"{base}/api/upload/validate",
+                files={"file": ("carga.xlsx", contenido)}
+            )
+            estados[respuesta.status_code] = estados.get(respuesta.status_code, 0) + 1
+            if respuesta.status_code == 429:
+                time.sleep(0.1)
+
+    with ThreadPoolExecutor(subidas + 1) as pool:
+        tareas = [pool.submit(health)] + [pool.submit(subir) for _ in range(subidas)]
+        for tarea in tareas:
+            tarea.result()
+
+    return {"latencias": latencias, "estados": estados}
+
+
+def main(args):
+    UploadCacheService.get_validacion = staticmethod(sin_cache)
+    modos = {
+        "loop": EjecucionEnLoop(),
+        "hilos": EjecucionEnHilos(),
+        "procesos": PoolProcesos(args.procesos, args.max_cola),
+    }
+
+    fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        generar_archivo(ruta, args.filas)
+        with open(ruta, "rb") as archivo:
+            contenido = archivo.read()
+    finally:
+        os.remove(ruta)
+
+    print(f"{'modo':<9} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'health':>6} | subidas por estado")
+    for nombre in args.modos:
+        upload.pool_procesos = modos[nombre]
+        servidor = uvicorn.Server(uvicorn.Config(crear_app(), port=args.puerto, log_level="warning"))
+        hilo = threading.Thread(target=servidor.run, daemon=True)
+        hilo.start()
+        while not servidor.started:
+            time.sleep(0.05)
+
+        try:
+            resultado = medir(f"http://127.0.0.1:{args.puerto}", contenido, args.segundos, args.subidas)
+        finally:
+            servidor.should_exit = True
+            hilo.join()
+            if isinstance(modos[nombre], PoolProcesos):
+                modos[nombre].cerrar()
+
+        latencias = [l * 1000 for l in resultado["latencias"]]
+        print(
+            f"{nombre:<9} | {percentil(latencias, 50):>8.1f} | {percentil(latencias, 99):>8.1f} | "
+            f"{max(latencias):>8.1f} | {len(latencias):>6} | {dict(sorted(resultado['estados'].items()))}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--subidas", type=int, default=4, help="Clientes subiendo archivos a la vez")
+    parser.add_argument("--segundos", type=float, default=15)
+    parser.add_argument("--procesos", type=int, default=2)
+    parser.add_argument("--max-cola", type=int, default=8)
+    parser.add_argument("--modos", nargs="+", choices=["loop", "hilos", "procesos"], default=["loop", "hilos", "procesos"])
+    parser.add_argument("--puerto", type=int, default=8766)
+    main(parser.parse_args())
@@ -0,0 +1,145 @@
+"""
+Benchmark de los listados: requests/segundo antes y después de la ruta rápida.
+
+La ruta anterior cargaba objetos ORM, construía un PersonaResponse por fila, lo
+volcaba a dict y envolvía todo en ApiResponse (que FastAPI volvía a validar y
+serializar). La ruta actual selecciona solo columnas y serializa con orjson.
+
+Levanta uvicorn en un hilo con ambas versiones y las mide con clientes HTTP
+concurrentes contra la misma base de datos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_listados --filas 5000 --limit 100 1000 --segundos 10
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Depends, Query
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.database import Base, ASYNC_DATABASE_URL, get_db
+from app.models.persona import Persona
+from app.routers import personas
+from app.schemas.persona import PersonaResponse
+from app.schemas.response import ApiResponse, success_response
+
+DOMINIO = "benchmark.example.com"
+
+
+def crear_app(session_factory) -> FastAPI:
+    app = FastAPI()
+    app.include_router(personas.router, prefix="/api")
+
+    @app.get("/anterior/personas", response_model=ApiResponse)
+    async def get_personas_anterior(
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+        db: AsyncSession = Depends(get_db)
+    ):
+        result = await db.execute(
+            select(Persona).offset(skip).limit(limit).order_by(Persona.created_at.desc())
+        )
+        personas_response = [PersonaResponse.model_validate(p) for p in result.scalars().all()]
+        return success_response(
+            titulo="Personas Obtenidas",
+            mensaje=f"Se encontraron {len(personas_response)} personas",
+            datos={
+                "personas": [p.model_dump() for p in personas_response],
+                "total": len(personas_response)
+            }
+        )
+
+    async def get_db_bench():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_db_bench
+    return app
+
+
+async def preparar(engine, session_factory, filas: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await limpiar(session_factory)
+    async with session_factory() as db:
+        for inicio in range(0, filas, 1000):
+            await db.execute(insert(Persona), [
+                {
+                    "nombre": f"Nombre{i}",
+                    "apellido": f"Apellido{i}",
+                    "edad": i % 100,
+                    "correo": f"lista-{i}@{DOMINIO}",
+                    "tipo_sangre": "O+"
+                }
+                for i in range(inicio, min(inicio + 1000, filas))
+            ])
+        await db.commit()
+
+
+async def limpiar(session_factory):
+    async with session_factory() as db:
+        await db.execute(delete(Persona).where(Persona.correo.like(f"%@{DOMINIO}")))
+        await db.commit()
+
+
+def medir(url: str, segundos: float, clientes: int) -> float:
+    fin = time.perf_counter() + segundos
+
+    def cliente():
+        sesion = requests.Session()
+        realizadas = 0
+        while time.perf_counter() < fin:
+            respuesta = sesion.get(url)
+            respuesta.raise_for_status()
+            realizadas += 1
+        return realizadas
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(clientes) as pool:
+        total = sum(pool.map(lambda _: cliente(), range(clientes)))
+    return total / (time.perf_counter() - inicio)
+
+
+def main(args):
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(preparar(engine, session_factory, args.filas))
+
+    servidor = uvicorn.Server(uvicorn.Config(
+        crear_app(async_sessionmaker(create_async_engine(args.database_url), expire_on_commit=False)),
+        port=args.puerto,
+        log_level="warning"
+    ))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{args.puerto}"
+    try:
+        print(f"{'limit':>6} | {'ruta':<9} | {'req/s':>8}")
+        for limit in args.limit:
+            for nombre, ruta in (("anterior", "/anterior/personas"), ("orjson", "/api/personas")):
+                rps = medir(f"{base}{ruta}?limit={limit}", args.segundos, args.clientes)
+                print(f"{limit:>6} | {nombre:<9} | {rps:>8.1f}")
+    finally:
+        servidor.should_exit = True
+        hilo.join()
+        asyncio.run(limpiar(session_factory))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=ASYNC_DATABASE_URL)
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--limit", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--clientes", type=int, default=4)
+    parser.add_argument("--puerto", type=int, default=8765)
+    main(parser.parse_args())
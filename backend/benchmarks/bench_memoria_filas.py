@@ -0,0 +1,84 @@
+"""
+Benchmark de memoria de la representación de filas entre el parseo y el INSERT.
+
+Compara el pico de RSS al retener N filas válidas como:
+  - orm:      PersonaCreate validado y luego un objeto Persona de SQLAlchemy (anterior)
+  - pydantic: PersonaCreate validado
+  - slots:    FilaPersona (validacion_rapida.validar_fila, camino actual)
+
+Cada medición corre en un proceso nuevo; se informa el pico por encima de la línea base
+del proceso, normalizado por cada 10k filas.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_memoria_filas --filas 10000 100000
+"""
+import argparse
+import gc
+import multiprocessing
+import resource
+import time
+
+from app.models.persona import Persona
+from app.schemas.persona import PersonaCreate
+from app.services.validacion_rapida import validar_fila, TIPOS_SANGRE
+
+
+def con_orm(nombre, apellido, edad, correo, tipo_sangre) -> Persona:
+    persona = PersonaCreate(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+    return Persona(**persona.model_dump())
+
+
+def con_pydantic(nombre, apellido, edad, correo, tipo_sangre) -> PersonaCreate:
+    return PersonaCreate(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+
+
+MODOS = {"orm": con_orm, "pydantic": con_pydantic, "slots": validar_fila}
+
+
+def filas_crudas(filas: int):
+    tipos = list(TIPOS_SANGRE)
+    for i in range(filas):
+        yield f"Nombre{i}", f"Apellido{i}", i % 100, f"persona{i}@example.com", tipos[i % len(tipos)]
+
+
+def pico_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(modo: str, filas: int, cola):
+    construir = MODOS[modo]
+    # Calentar imports y cachés (validadores, mapeo ORM) antes de la línea base
+    construir(*next(filas_crudas(1)))
+    gc.collect()
+    base = pico_rss_mb()
+
+    inicio = time.perf_counter()
+    retenidas = [construir(*fila) for fila in filas_crudas(filas)]
+    transcurrido = time.perf_counter() - inicio
+    cola.put((transcurrido, pico_rss_mb() - base, len(retenidas)))
+
+
+def en_proceso_nuevo(modo: str, filas: int):
+    cola = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=medir, args=(modo, filas, cola))
+    proceso.start()
+    resultado = cola.get()
+    proceso.join()
+    return resultado
+
+
+def main(args):
+    print(f"{'filas':>8} | {'modo':<9} | {'tiempo (s)':>10} | {'pico RSS (MB)':>13} | {'MB / 10k filas':>14}")
+    for filas in args.filas:
+        for modo in args.modos:
+            tiempo, pico_mb, total = en_proceso_nuevo(modo, filas)
+            assert total == filas
+            print(f"{filas:>8} | {modo:<9} | {tiempo:>10.2f} | {pico_mb:>13.1f} | {pico_mb * 10000 / filas:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Benchmark de XLSXValidator.validar_registros: lectura doble contra lectura única.
+
+La ruta anterior abría el archivo con openpyxl para validar los encabezados y
+luego lo volvía a leer completo con pd.read_excel. Cada medición corre en un
+proceso nuevo para que el pico de memoria (RSS) no se contamine entre corridas.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_validacion --filas 50000 100000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+
+from app.services.xlsx_validator import XLSXValidator
+
+
+class XLSXValidatorDobleLectura(XLSXValidator):
+    """Reproduce la lectura anterior: encabezados con openpyxl y datos con pd.read_excel"""
+
+    def _leer_hoja(self):
+        if self._hoja_cache is None:
+            # validar_estructura: solo encabezados con openpyxl
+            workbook = openpyxl.load_workbook(self.file_path, read_only=True)
+            self._hoja_cache = [
+                str(cell.value).strip().lower().replace(" ", "_") if cell.value is not None else ""
+                for cell in workbook.active[1]
+            ]
+            workbook.close()
+            return self._hoja_cache, None
+
+        # validar_registros: segunda lectura completa con pandas
+        df = pd.read_excel(self.file_path)
+        df.columns = [str(col).strip().lower().replace(" ", "_") for col in df.columns]
+        return self._hoja_cache, df
+
+
+def generar_archivo(ruta: str, filas: int):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Nombre", "Apellido", "Edad", "Correo", "Tipo Sangre"])
+    tipos = XLSXValidator.TIPOS_SANGRE_VALIDOS
+    for i in range(filas):
+        sheet.append([f"Nombre{i}", f"Apellido{i}", i % 100, f"persona{i}@example.com", tipos[i % len(tipos)]])
+    workbook.save(ruta)
+
+
+def medir(clase, ruta: str, cola):
+    inicio = time.perf_counter()
+    resultado = clase(ruta, incluir_validos=False).validar_registros()
+    transcurrido = time.perf_counter() - inicio
+    # ru_maxrss está en KB en Linux
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    cola.put((transcurrido, pico_mb, resultado.total_registros))
+
+
+def en_proceso_nuevo(clase, ruta: str):
+    cola = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=medir, args=(clase, ruta, cola))
+    proceso.start()
+    resultado = cola.get()
+    proceso.join()
+    return resultado
+
+
+def main(filas_por_corrida):
+    print(f"{'filas':>8} | {'modo':<14} | {'tiempo (s)':>10} | {'pico RSS (MB)':>13}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for filas in filas_por_corrida:
+            ruta = os.path.join(directorio, f"fixture_{filas}.xlsx")
+            generar_archivo(ruta, filas)
+            for nombre, clase in (("doble lectura", XLSXValidatorDobleLectura), ("lectura única", XLSXValidator)):
+                tiempo, pico_mb, total = en_proceso_nuevo(clase, ruta)
+                assert total == filas
+                print(f"{filas:>8} | {nombre:<14} | {tiempo:>10.2f} | {pico_mb:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 50000, 100000])
+    args = parser.parse_args()
+    main(args.filas)
@@ -0,0 +1,48 @@
+"""
+Benchmark de validacion_rapida.validar_persona contra PersonaCreate sobre filas válidas.
+
+La equivalencia de ambos caminos la comprueba la prueba diferencial de
+tests/test_validacion_rapida.py; aquí solo se mide el rendimiento.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_validacion_rapida --filas 100000
+"""
+import argparse
+import time
+
+from app.schemas.persona import PersonaCreate
+from app.services.validacion_rapida import validar_persona, TIPOS_SANGRE
+
+
+def filas_validas(filas: int) -> list:
+    tipos = list(TIPOS_SANGRE)
+    return [
+        [f"Nombre{i}", f"Apellido{i}", i % 151, f"persona{i}@example.com", tipos[i % len(tipos)]]
+        for i in range(filas)
+    ]
+
+
+def con_pydantic(nombre, apellido, edad, correo, tipo_sangre) -> PersonaCreate:
+    return PersonaCreate(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+
+
+def medir(validador, filas: list) -> float:
+    inicio = time.perf_counter()
+    for fila in filas:
+        validador(*fila)
+    return len(filas) / (time.perf_counter() - inicio)
+
+
+def main(args):
+    validas = filas_validas(args.filas)
+    pydantic_rps = medir(con_pydantic, validas)
+    rapida_rps = medir(validar_persona, validas)
+    print(f"{'validador':<10} | {'filas/s':>10}")
+    print(f"{'pydantic':<10} | {pydantic_rps:>10.0f}")
+    print(f"{'rápida':<10} | {rapida_rps:>10.0f}  (x{rapida_rps / pydantic_rps:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,193 @@
+import asyncio
+import glob
+import os
+
+import openpyxl
+import pytest
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models import Persona
+from app.schemas.historial import HistorialCargaCreate, TipoDetalle
+from app.schemas.persona import ModoCarga
+from app.services.historial_service import HistorialService
+from app.services.persona_service import PersonaService
+from app.services import xlsx_stream
+from app.tasks import carga_tasks
+
+FILAS = 30
+# Índice de fila de datos -> correo repetido: en otra parte, con otra capitalización,
+# dentro de la misma parte y ya registrado antes de la carga
+REPETIDOS = {
+    14: "persona3@example.com",
+    25: "PERSONA12@example.com",
+    27: "persona26@example.com",
+    18: "existente@example.com",
+}
+INVALIDAS = {7: ("Edad", "z"), 21: ("Tipo_Sangre", "Q")}
+COLUMNAS = ["Nombre", "Apellido", "Edad", "Correo", "Tipo_Sangre"]
+
+
+@pytest.fixture
+def repartir(monkeypatch):
+    """Tres partes de 10 filas, insertadas en bloques de 4"""
+    monkeypatch.setattr(settings, "PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(settings, "PARALLEL_CHUNK_ROWS", 10)
+    monkeypatch.setattr(settings, "BULK_INSERT_CHUNK_SIZE", 4)
+
+
+def crear_xlsx(ruta: str):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNAS)
+    for i in range(FILAS):
+        valores = {
+            "Nombre": f"Nombre{i}",
+            "Apellido": f"Apellido{i}",
+            "Edad": 20 + i,
+            "Correo": REPETIDOS.get(i, f"persona{i}@example.com"),
+            "Tipo_Sangre": "O+",
+        }
+        if i in INVALIDAS:
+            columna, valor = INVALIDAS[i]
+            valores[columna] = valor
+        sheet.append([valores[columna] for columna in COLUMNAS])
+    workbook.save(ruta)
+
+
+def preparar_carga(sesiones, tmp_path, modo: ModoCarga = ModoCarga.SKIP) -> tuple:
+    ruta = str(tmp_path / "carga.xlsx")
+    crear_xlsx(ruta)
+
+    async def crear():
+        engine, SessionLocal = sesiones()
+        async with SessionLocal() as db:
+            db.add(Persona(nombre="Ya", apellido="Existe", edad=40, correo="existente@example.com",
+                           correo_dominio="example.com", tipo_sangre="A+"))
+            await db.commit()
+            historial = await HistorialService.create(db, HistorialCargaCreate(
+                nombre_archivo="carga.xlsx", total_registros=FILAS, fue_asincrono=True,
+                task_id="tarea-carga", modo=modo.value, ruta_archivo=ruta, estado="pending"
+            ))
+        await engine.dispose()
+        return historial.id
+
+    return ruta, asyncio.run(crear())
+
+
+def estado_carga(sesiones, historial_id: int) -> tuple:
+    async def consultar():
+        engine, SessionLocal = sesiones()
+        async with SessionLocal() as db:
+            historial = await HistorialService.get_by_id(db, historial_id)
+            duplicados, _ = await HistorialService.get_detalles(db, historial_id, TipoDetalle.DUPLICADOS)
+            personas = (await db.execute(select(func.count(Persona.id)))).scalar()
+        await engine.dispose()
+        return historial, duplicados, personas
+
+    return asyncio.run(consultar())
+
+
+def procesar(ruta: str, historial_id: int, modo: ModoCarga = ModoCarga.SKIP):
+    return carga_tasks.procesar_archivo.apply(
+        kwargs={"ruta": ruta, "historial_id": historial_id, "modo": modo.value},
+        task_id="tarea-carga"
+    )
+
+
+def test_carga_repartida_consolida_historial(sesiones, repartir, tmp_path):
+    ruta, historial_id = preparar_carga(sesiones, tmp_path)
+
+    resultado = procesar(ruta, historial_id)
+
+    assert resultado.successful(), resultado.traceback
+    historial, duplicados, personas = estado_carga(sesiones, historial_id)
+    assert historial.estado == "completed"
+    assert set(historial.checkpoints) == {"parte0", "parte1", "parte2"}
+    assert historial.registros_exitosos == FILAS - len(REPETIDOS) - len(INVALIDAS)
+    assert historial.registros_duplicados == len(REPETIDOS)
+    assert historial.registros_error == len(INVALIDAS)
+    assert personas == historial.registros_exitosos + 1
+    assert sorted(d["correo"].lower() for d in duplicados) == sorted(c.lower() for c in REPETIDOS.values())
+    assert resultado.result["registros_exitosos"] == historial.registros_exitosos
+    # Partes, marca de división y XLSX se borran al consolidar
+    assert glob.glob(f"{ruta}*") == []
+
+
+def test_division_interrumpida_se_repite(sesiones, repartir, tmp_path, monkeypatch):
+    ruta, historial_id = preparar_carga(sesiones, tmp_path)
+    abrir = open
+    aperturas = []
+
+    def abrir_con_fallo(archivo, *args, **kwargs):
+        if str(archivo).endswith(".tmp"):
+            aperturas.append(archivo)
+            if len(aperturas) == 2:
+                raise OSError("Disco lleno")
+        return abrir(archivo, *args, **kwargs)
+
+    with monkeypatch.context() as parche:
+        parche.setattr(xlsx_stream, "open", abrir_con_fallo, raising=False)
+        assert procesar(ruta, historial_id).failed()
+    # Sin la marca de división las partes no cuentan y el XLSX se conserva
+    assert carga_tasks.partes_pendientes(ruta) == []
+    assert os.path.exists(ruta)
+
+    assert procesar(ruta, historial_id).successful()
+    historial, _, personas = estado_carga(sesiones, historial_id)
+    assert historial.estado == "completed"
+    assert historial.registros_exitosos == FILAS - len(REPETIDOS) - len(INVALIDAS)
+    assert personas == historial.registros_exitosos + 1
+
+
+def test_detalles_en_historial_y_solo_muestras_en_memoria(sesiones, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_INSERT_CHUNK_SIZE", 4)
+    monkeypatch.setattr(settings, "UPLOAD_REPORT_SAMPLES", 1)
+    ruta, historial_id = preparar_carga(sesiones, tmp_path)
+    lectores, cargas = [], []
+    confirmar_bloque = carga_tasks._confirmar_bloque
+    bulk_create = PersonaService.bulk_create
+
+    def espiar_lector(db, historial_id, origen, lector):
+        lectores.append(lector)
+        return confirmar_bloque(db, historial_id, origen, lector)
+
+    async def espiar_carga(*args, **kwargs):
+        cargas.append(await bulk_create(*args, **kwargs))
+        return cargas[-1]
+
+    monkeypatch.setattr(carga_tasks, "_confirmar_bloque", espiar_lector)
+    monkeypatch.setattr(PersonaService, "bulk_create", staticmethod(espiar_carga))
+    assert procesar(ruta, historial_id).successful()
+
+    # Una sola tarea (sin repartir): todos los errores y duplicados pasan por el mismo lector
+    [lector], [carga] = lectores, cargas
+    assert len(lector.errores) == 1 and sum(lector.errores_por_tipo.values()) == len(INVALIDAS)
+    assert len(carga.duplicados) == 1 and carga.total_duplicados == len(REPETIDOS)
+
+    async def contar():
+        engine, SessionLocal = sesiones()
+        async with SessionLocal() as db:
+            cantidades = await HistorialService.contar_detalles(db, historial_id)
+        await engine.dispose()
+        return cantidades
+
+    assert asyncio.run(contar()) == {"duplicados": len(REPETIDOS), "errores": len(INVALIDAS)}
+    historial, _, _ = estado_carga(sesiones, historial_id)
+    assert historial.registros_duplicados == len(REPETIDOS)
+    assert historial.registros_error == len(INVALIDAS)
+
+
+@pytest.mark.parametrize("modo", [ModoCarga.FAIL, ModoCarga.UPSERT])
+def test_fail_y_upsert_no_se_reparten(sesiones, repartir, tmp_path, monkeypatch, modo):
+    ruta, historial_id = preparar_carga(sesiones, tmp_path, modo)
+    llamadas = []
+
+    async def procesar_en_una_tarea(task, ruta, historial_id, modo):
+        llamadas.append(modo)
+        return {}
+
+    monkeypatch.setattr(carga_tasks, "_procesar_archivo", procesar_en_una_tarea)
+    assert procesar(ruta, historial_id, modo).successful()
+    assert llamadas == [modo]
+    assert glob.glob(f"{ruta}.parte*") == []
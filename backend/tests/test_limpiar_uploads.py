@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+
+from app.core.config import settings
+from app.schemas.historial import HistorialCargaCreate
+from app.services.historial_service import HistorialService
+from app.tasks import carga_tasks
+
+ANTIGUO = time.time() - 10 ** 6
+
+
+def crear(directorio, nombre: str, antiguo: bool = True) -> str:
+    ruta = os.path.join(directorio, nombre)
+    open(ruta, "w").close()
+    if antiguo:
+        os.utime(ruta, (ANTIGUO, ANTIGUO))
+    return ruta
+
+
+def test_borra_uploads_vencidos_salvo_cargas_activas(sesiones, tmp_path, monkeypatch):
+    directorio = str(tmp_path / "uploads")
+    os.mkdir(directorio)
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", directorio)
+    for nombre in ["huerfana.xlsx", "huerfana.xlsx.parte3.jsonl.tmp", "fallida.xlsx", "fallida.xlsx.parte0.jsonl",
+                   "fallida.xlsx.partes", "pendiente.xlsx", "en_curso.xlsx", "en_curso.xlsx.parte1.jsonl",
+                   "desaparecida.xlsx"]:
+        crear(directorio, nombre)
+    crear(directorio, "reciente.xlsx", antiguo=False)
+    # Con una parte modificada hace poco, el grupo completo sigue vigente
+    crear(directorio, "reanudada.xlsx")
+    crear(directorio, "reanudada.xlsx.parte0.jsonl", antiguo=False)
+
+    async def registrar():
+        engine, SessionLocal = sesiones()
+        async with SessionLocal() as db:
+            for nombre, estado in [("fallida", "failed"), ("pendiente", "pending"), ("en_curso", "processing")]:
+                await HistorialService.create(db, HistorialCargaCreate(
+                    nombre_archivo=f"{nombre}.xlsx", fue_asincrono=True, task_id=nombre,
+                    ruta_archivo=os.path.join(directorio, f"{nombre}.xlsx"), estado=estado
+                ))
+        await engine.dispose()
+
+    asyncio.run(registrar())
+
+    # Otro proceso borra un archivo entre el listado y la consulta de su fecha
+    getmtime = os.path.getmtime
+
+    def getmtime_con_carrera(ruta):
+        if ruta.endswith("desaparecida.xlsx"):
+            os.remove(ruta)
+        return getmtime(ruta)
+
+    monkeypatch.setattr(os.path, "getmtime", getmtime_con_carrera)
+
+    assert carga_tasks.limpiar_uploads.apply().get() == 2
+    assert sorted(os.listdir(directorio)) == [
+        "en_curso.xlsx", "en_curso.xlsx.parte1.jsonl", "pendiente.xlsx",
+        "reanudada.xlsx", "reanudada.xlsx.parte0.jsonl", "reciente.xlsx",
+    ]
@@ -0,0 +1,54 @@
+import io
+
+import openpyxl
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+
+
+@pytest.fixture
+def cliente(sesiones):
+    async def get_db_prueba():
+        engine, SessionLocal = sesiones()
+        async with SessionLocal() as db:
+            yield db
+        await engine.dispose()
+
+    app.dependency_overrides[get_db] = get_db_prueba
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db)
+
+
+def contenido_xlsx(correos) -> bytes:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Nombre", "Apellido", "Edad", "Correo", "Tipo_Sangre"])
+    for correo in correos:
+        sheet.append(["Nombre", "Apellido", 30, correo, "O+"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_task_id_repetido_se_rechaza(cliente):
+    primera = cliente.post(
+        "/api/upload/validate-and-process?task_id=carga-1",
+        files={"file": ("a.xlsx", contenido_xlsx(["a@example.com"]))}
+    )
+    assert primera.status_code == 200
+    assert primera.json()["datos"]["task_id"] == "carga-1"
+
+    repetida = cliente.post(
+        "/api/upload/validate-and-process?task_id=carga-1",
+        files={"file": ("b.xlsx", contenido_xlsx(["b@example.com"]))}
+    )
+    assert repetida.status_code == 409
+
+    nueva = cliente.post(
+        "/api/upload/validate-and-process",
+        files={"file": ("b.xlsx", contenido_xlsx(["b@example.com"]))}
+    )
+    assert nueva.status_code == 200
+    assert nueva.json()["datos"]["task_id"] != "carga-1"
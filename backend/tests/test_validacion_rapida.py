@@ -0,0 +1,99 @@
+"""
+Prueba diferencial de validacion_rapida.validar_persona y validar_fila contra PersonaCreate.
+
+El corpus combina filas válidas generadas, casos límite de cada campo (longitudes, rangos
+de edad, tipos de sangre, direcciones que email-validator rechaza o normaliza) y mutaciones
+aleatorias de correos válidos. Para cada fila, cada camino rápido debe dar lo mismo que
+Pydantic: los valores volcados (model_dump o parametros) o la lista de errores.
+"""
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.persona import PersonaCreate
+from app.services.validacion_rapida import fila_valida, validar_fila, validar_persona, TIPOS_SANGRE
+
+NOMBRES = ["", " ", "a", "x" * 100, "x" * 101, "ñandú", "José María", "None", "\t", "名前"]
+EDADES = [-1, 0, 1, 150, 151, 10 ** 6, True]
+TIPOS = list(TIPOS_SANGRE) + ["", "o+", "AB", "A+ ", "C+", "0+", "None"]
+CORREOS = [
+    "a@b.co", "A@b.co", "a@B.co", "a@b.CO", "a.b@c.com", "a..b@c.com", ".a@c.com", "a.@c.com",
+    "user+tag@example.com", "o'brien@example.com", "{|}~#$%&*/=?^`@b.io", "a_b-c@sub.dominio.org",
+    "a@c", "a@localhost", "a@x.local", "a@x.test", "a@x.arpa", "a@x.invalid", "a@x.onion",
+    "a@test.com", "a@local.com", "a@xn--bcher-kva.com", "a@ab--cd.com", "a@xn--abc.com",
+    "a@-a.com", "a@a-.com", "a@a.c", "a@a.c1", "a@a.123", "a@1.com", "a@1.2.3.4", "a@[1.2.3.4]",
+    "a b@c.com", "<a@b.com>", "John <a@b.com>", "a@b.com ", " a@b.com", "a@b.com\n",
+    "ünï@b.com", "a@bücher.com", "a@@b.com", "", "None", "@b.com", "a@", "a@b.c-m", "a@b.co.",
+    "\"a\"@b.com", "a@b_c.com", "a@b.museum", "a@b.xn--p1ai", "a@" + "b" * 63 + ".com",
+    "a@" + "b" * 64 + ".com", "l" * 64 + "@b.com", "l" * 65 + "@b.com",
+    "a@" + ".".join(["d" * 60] * 4) + ".com", "l" * 64 + "@" + ".".join(["d" * 61] * 3) + ".co",
+]
+MUTACIONES = ".-_+@ A.Zü<>\"'()[],;:\\1é"
+
+
+def fila_base(i: int) -> list:
+    tipos = list(TIPOS_SANGRE)
+    return [f"Nombre{i}", f"Apellido{i}", i % 151, f"persona{i}@example.com", tipos[i % len(tipos)]]
+
+
+def generar_corpus(filas: int, mutaciones: int, semilla: int) -> list:
+    azar = random.Random(semilla)
+    corpus = [fila_base(i) for i in range(filas)]
+
+    # Un campo límite por fila, con el resto válido, y luego combinaciones al azar
+    for campo, valores in ((0, NOMBRES), (1, NOMBRES), (2, EDADES), (3, CORREOS), (4, TIPOS)):
+        for valor in valores:
+            fila = fila_base(len(corpus))
+            fila[campo] = valor
+            corpus.append(fila)
+    for _ in range(len(CORREOS) * 20):
+        corpus.append([
+            azar.choice(NOMBRES), azar.choice(NOMBRES), azar.choice(EDADES),
+            azar.choice(CORREOS), azar.choice(TIPOS)
+        ])
+
+    for i in range(mutaciones):
+        correo = list(azar.choice(CORREOS[:12]))
+        for _ in range(azar.randint(1, 3)):
+            posicion = azar.randrange(len(correo) + 1)
+            if azar.random() < 0.5 and posicion < len(correo):
+                correo[posicion] = azar.choice(MUTACIONES)
+            else:
+                correo.insert(posicion, azar.choice(MUTACIONES))
+        fila = fila_base(i)
+        fila[3] = "".join(correo)
+        corpus.append(fila)
+
+    return corpus
+
+
+def resultado(validador, fila: list):
+    try:
+        persona = validador(*fila)
+        return "ok", persona.parametros() if validador is validar_fila else persona.model_dump()
+    except ValidationError as e:
+        return "error", [(err["loc"], err["type"], err["msg"]) for err in e.errors()]
+
+
+def con_pydantic(nombre, apellido, edad, correo, tipo_sangre) -> PersonaCreate:
+    return PersonaCreate(nombre=nombre, apellido=apellido, edad=edad, correo=correo, tipo_sangre=tipo_sangre)
+
+
+CORPUS = generar_corpus(filas=2000, mutaciones=20000, semilla=0)
+
+
+@pytest.mark.parametrize("validador", [validar_persona, validar_fila])
+def test_camino_rapido_igual_a_pydantic(validador):
+    diferencias = []
+    for fila in CORPUS:
+        esperado, obtenido = resultado(con_pydantic, fila), resultado(validador, fila)
+        if esperado != obtenido:
+            diferencias.append((fila, esperado, obtenido))
+    assert diferencias == []
+
+
+def test_corpus_cubre_ambos_caminos():
+    # Con filas de un solo tipo la comparación no probaría el camino rápido o el de Pydantic
+    rapidas = sum(fila_valida(*fila) for fila in CORPUS)
+    assert 0 < rapidas < len(CORPUS)
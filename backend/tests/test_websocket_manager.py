@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.core.pubsub import MemoryPubSub
+from app.core.websocket_manager import ConnectionManager
+
+
+class SocketFalso:
+    def __init__(self):
+        self.mensajes = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, mensaje):
+        self.mensajes.append(mensaje)
+
+
+def tipos(socket: SocketFalso) -> list:
+    return [mensaje["type"] for mensaje in socket.mensajes]
+
+
+async def cargar_con_dos_clientes(manager: ConnectionManager) -> tuple:
+    suscrito, ajeno = SocketFalso(), SocketFalso()
+    for socket in (suscrito, ajeno):
+        await manager.connect(socket)
+    manager.subscribe(suscrito, "tarea-1")
+
+    await manager.start_relay()
+    await asyncio.sleep(0)
+    await manager.notify_upload_start("carga.xlsx", 100, task_id="tarea-1")
+    await manager.notify_upload_progress("tarea-1", 50, 50, 100)
+    await manager.notify_upload_complete("carga.xlsx", 100, 0, 0, task_id="tarea-1")
+    # El relay entrega los eventos publicados en otras vueltas del event loop; el último
+    # evento de la tarea marca que los anteriores ya se repartieron
+    for _ in range(100):
+        if "upload_complete" in tipos(suscrito):
+            break
+        await asyncio.sleep(0)
+    await manager.stop_relay()
+    return suscrito, ajeno
+
+
+@pytest.mark.parametrize("backend", [None, MemoryPubSub], ids=["directo", "pubsub"])
+def test_progreso_solo_a_suscriptores(backend):
+    manager = ConnectionManager(backend() if backend else None)
+
+    suscrito, ajeno = asyncio.run(cargar_con_dos_clientes(manager))
+
+    assert tipos(suscrito) == ["upload_start", "upload_progress", "upload_complete"]
+    assert tipos(ajeno) == []
@@ -0,0 +1,50 @@
+import re
+import zipfile
+
+import openpyxl
+import pytest
+
+from app.services.xlsx_stream import leer_personas_xlsx
+
+
+def crear_xlsx(ruta, filas: int, dimension: str = None):
+    """XLSX con `filas` personas; `dimension` reemplaza la etiqueta <dimension> de la hoja"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Nombre", "Apellido", "Edad", "Correo", "Tipo_Sangre"])
+    for i in range(filas):
+        sheet.append([f"Nombre{i}", f"Apellido{i}", 30, f"persona{i}@example.com", "A+"])
+    workbook.save(ruta)
+
+    if dimension is not None:
+        with zipfile.ZipFile(ruta) as original:
+            contenido = {nombre: original.read(nombre) for nombre in original.namelist()}
+        hoja = "xl/worksheets/sheet1.xml"
+        contenido[hoja] = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="{dimension}"'.encode(), contenido[hoja])
+        with zipfile.ZipFile(ruta, "w") as modificado:
+            for nombre, datos in contenido.items():
+                modificado.writestr(nombre, datos)
+
+
+@pytest.mark.parametrize("dimension", [None, "A1"], ids=["dimension_real", "dimension_falsa"])
+def test_archivo_chico_se_lee_completo(tmp_path, dimension):
+    ruta = tmp_path / "chico.xlsx"
+    crear_xlsx(ruta, 5, dimension)
+
+    lectura = leer_personas_xlsx(str(ruta), max_filas=10)
+
+    assert lectura.leida
+    assert lectura.total_filas == 5
+    assert [persona.correo for persona in lectura.personas()] == [f"persona{i}@example.com" for i in range(5)]
+
+
+@pytest.mark.parametrize("dimension", [None, "A1"], ids=["dimension_real", "dimension_falsa"])
+def test_archivo_grande_no_se_lee_aunque_la_dimension_mienta(tmp_path, dimension):
+    ruta = tmp_path / "grande.xlsx"
+    crear_xlsx(ruta, 25, dimension)
+
+    lectura = leer_personas_xlsx(str(ruta), max_filas=10)
+
+    assert not lectura.leida
+    assert lectura.total_filas > 10
+    assert lectura.validas == [] and lectura.errores == []